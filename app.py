@@ -1,51 +1,48 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import date, datetime, timedelta
 import calendar
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+import httplib2
 import time
 import socket
+import os
+import sqlite3
+from contextlib import closing
+import threading
 import re
 import hashlib
 import json
+import uuid
 
 # =========================
 # CONFIG
 # =========================
 st.set_page_config(page_title="RM Insurance Planner", layout="wide")
 
-PROJECT_COLUMNS = [
-    "Area", "Project", "Task", "Owner",
-    "Progress", "Priority", "Release Date", "Due Date", "GR/Mail Object", "Notes", "Last Update", "Order"
-]
-
-EOM_BASE_COLUMNS = [
-    "Area", "ID Macro", "ID Micro",
-    "Activity", "Frequency", "Files", "🗑️ Delete", "Last Update", "Order"
-]
-
 # ✅ Colonna separata per le descrizioni delle attività EOM
 EOM_DESCRIPTIONS_SHEET = "EOM_Descriptions"
-EOM_DESCRIPTIONS_COLUMNS = ["Activity", "Description", "Last Update"]
+# ✅ Stati EOM in formato lungo: una riga per attività (Key) e mese (YYYY-MM)
+EOM_STATUS_SHEET = "EOM_Status"
+# ✅ Archivio degli stati dei mesi chiusi (prima della finestra visibile): si carica
+# solo quando servono i mesi vecchi
+EOM_ARCHIVE_SHEET = "EOM_Status_Archive"
 
 # =========================
 # ✅ AD HOC ACTIVITIES (UPDATED: NO OWNER + MACRO/MICRO + SORT + AUTOFILL + DESCRIPTIONS)
 # =========================
 ADHOC_SHEET_NAME = "AdHoc"
-ADHOC_COLUMNS = [
-    "Area", "ID Macro", "ID Micro",
-    "Activity",
-    "Status",
-    "Last Done",
-    "Notes",
-    "🗑️ Delete",
-    "Last Update",
-    "Order"
-]
-
 ADHOC_DESCRIPTIONS_SHEET = "ADHOC_Descriptions"
-ADHOC_DESCRIPTIONS_COLUMNS = ["Activity", "Description", "Last Update"]
+
+# ✅ Foglio tecnico con la revisione di ogni foglio: ogni scrittura la aggiorna, così un
+# reload può verificare se il foglio è cambiato senza scaricarlo
+META_SHEET = "_Meta"
+META_COLUMNS = ["Sheet", "Revision"]
+# marcatori nello stesso foglio, dopo le revisioni: operazioni una-tantum già fatte
+EOM_ROLLOVER_MARKER = "eom_rollover"
 
 # =========================
 # ✅ STATUS DOTS (white default + gray/green/red)
@@ -55,96 +52,655 @@ EOM_GRAY  = "⚫"   # not to do (excluded from denominator)
 EOM_GREEN = "🟢"   # done
 EOM_RED   = "🔴"   # not done
 EOM_STATUS_OPTIONS = [EOM_WHITE, EOM_GRAY, EOM_GREEN, EOM_RED]
+STATUS_DTYPE = pd.CategoricalDtype(EOM_STATUS_OPTIONS)
+
+# ✅ Valori accettati al posto dei pallini (vecchi fogli, inserimenti a mano); il resto vale EOM_WHITE
+STATUS_EXACT = {
+    **{s: s for s in EOM_STATUS_OPTIONS},
+    **{s: EOM_GREEN for s in ["True", "true", "Done", "1"]},
+    **{s: EOM_RED for s in ["False", "false", "Undone", "0"]},
+}
+STATUS_LOWER = {s: EOM_GRAY for s in ["na", "n/a", "not applicable", "not to do", "skip", "skipped", "excluded", "no"]}
+
+progress_values = ["Not started", "In progress", "Completed"]
+progress_score = {"Not started": 0, "In progress": 0.5, "Completed": 1}
+priority_values = ["Low", "Important", "Urgent"]
+
+# progetti per pagina, per area, nella vista Projects
+PROJECTS_PAGE_SIZE = 20
+
+# =========================
+# ✅ SCHEMA DEI FOGLI
+# =========================
+# Per ogni colonna: tipo ("text", "key", "date", "int", "bool", "status", "choice", "category"),
+# default (usato se la colonna manca o il valore non è ammesso) e valori ammessi.
+# "status", "choice" e "category" restano Categorical dal caricamento al rendering:
+# "choice" e "category" tengono i valori non ammessi come categorie extra; "choice" porta
+# al default anche i valori vuoti. Una colonna "date" mancante vale NaT (adesso con default "now").
+# La colonna "key" è l'ID stabile della riga e diventa anche l'indice del DataFrame.
+# Il default None di una colonna "int" vale "posizione della riga" (Order).
+def schema_col(kind="text", default=None, allowed=None):
+    return {"kind": kind, "default": default, "allowed": allowed}
+
+PROJECT_SCHEMA = {
+    "Area": schema_col("text", ""),
+    "Project": schema_col("text", ""),
+    "Task": schema_col("text", ""),
+    "Owner": schema_col("text", ""),
+    "Progress": schema_col("choice", "Not started", progress_values),
+    "Priority": schema_col("category", "", priority_values),
+    "Release Date": schema_col("date"),
+    "Due Date": schema_col("date"),
+    "GR/Mail Object": schema_col("text", ""),
+    "Notes": schema_col("text", ""),
+    "Last Update": schema_col("date"),
+    "Order": schema_col("int"),
+    "Task ID": schema_col("key", ""),
+}
+PROJECT_COLUMNS = list(PROJECT_SCHEMA)
+
+EOM_BASE_SCHEMA = {
+    "Area": schema_col("text", ""),
+    "ID Macro": schema_col("text", ""),
+    "ID Micro": schema_col("text", ""),
+    "Activity": schema_col("text", ""),
+    "Frequency": schema_col("text", ""),
+    "Files": schema_col("text", ""),
+    "🗑️ Delete": schema_col("bool", False),
+    "Last Update": schema_col("date", "now"),
+    "Order": schema_col("int"),
+    "Key": schema_col("key", ""),
+}
+EOM_BASE_COLUMNS = list(EOM_BASE_SCHEMA)
+
+EOM_STATUS_SCHEMA = {
+    "Key": schema_col("text", ""),
+    "Month": schema_col("text", ""),
+    "Status": schema_col("status", EOM_WHITE),
+    "Updated At": schema_col("date"),
+}
+EOM_STATUS_COLUMNS = list(EOM_STATUS_SCHEMA)
+
+EOM_DESCRIPTIONS_SCHEMA = {
+    "Activity": schema_col("text", ""),
+    "Description": schema_col("text", ""),
+    "Last Update": schema_col("date"),
+}
+EOM_DESCRIPTIONS_COLUMNS = list(EOM_DESCRIPTIONS_SCHEMA)
+
+ADHOC_SCHEMA = {
+    "Area": schema_col("text", ""),
+    "ID Macro": schema_col("text", ""),
+    "ID Micro": schema_col("text", ""),
+    "Activity": schema_col("text", ""),
+    "Status": schema_col("status", EOM_WHITE),
+    "Last Done": schema_col("date"),
+    "Notes": schema_col("text", ""),
+    "🗑️ Delete": schema_col("bool", False),
+    "Last Update": schema_col("date", "now"),
+    "Order": schema_col("int"),
+    "Key": schema_col("key", ""),
+}
+ADHOC_COLUMNS = list(ADHOC_SCHEMA)
+
+ADHOC_DESCRIPTIONS_SCHEMA = {
+    "Activity": schema_col("text", ""),
+    "Description": schema_col("text", ""),
+    "Last Update": schema_col("date"),
+}
+ADHOC_DESCRIPTIONS_COLUMNS = list(ADHOC_DESCRIPTIONS_SCHEMA)
+
+# =========================
+# ✅ STORAGE
+# =========================
+def get_storage_setting(name, default):
+    """Impostazione di storage: variabile d'ambiente PLANNER_<NAME>, poi st.secrets, poi default"""
+    env_value = os.environ.get(f"PLANNER_{name.upper()}")
+    if env_value:
+        return env_value
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
+
+# "gsheets": Google Sheets (default)
+# "sqlite": file locale, per sviluppo offline, test di carico o team che non usano il foglio
+STORAGE_BACKEND = get_storage_setting("storage_backend", "gsheets")
+SQLITE_PATH = get_storage_setting("sqlite_path", "planner.db")
+
+# "delta": scrive solo le celle cambiate rispetto all'ultimo stato noto del foglio
+# "full": riscrittura completa + svuotamento delle righe/colonne in eccesso
+GSHEET_WRITE_MODE = "delta"
+# oltre questa quota di celle cambiate conviene riscrivere tutto il range in un colpo
+DELTA_FULL_REWRITE_RATIO = 0.5
+# letture e scritture su Google Sheets vanno a blocchi di righe (una batchGet per pagina)
+GSHEET_PAGE_ROWS = 5000
+# timeout (secondi) delle richieste HTTP verso Google Sheets, impostato sul client
+GSHEET_TIMEOUT = 15
+# i metadati dello spreadsheet (nomi e dimensioni dei fogli) restano validi per questo tempo
+GSHEET_METADATA_TTL = 300
 
 # =========================
 # GOOGLE SHEETS FUNCTIONS - VERSIONE OTTIMIZZATA
 # =========================
 @st.cache_resource
-def get_gsheet_service():
-    """Crea connessione a Google Sheets"""
-    credentials = service_account.Credentials.from_service_account_info(
+def get_gsheet_credentials():
+    """Credenziali del service account per Google Sheets"""
+    return service_account.Credentials.from_service_account_info(
         st.secrets["gcp_service_account"],
         scopes=["https://www.googleapis.com/auth/spreadsheets"]
     )
-    return build('sheets', 'v4', credentials=credentials)
 
-def create_sheet_if_not_exists(sheet_name, columns):
-    """Crea un nuovo foglio se non esiste"""
-    try:
-        service = get_gsheet_service()
-        spreadsheet_id = st.secrets["spreadsheet_id"]
+# =========================
+# ✅ DELTA WRITES (solo le celle cambiate)
+# =========================
+@st.cache_resource
+def get_sheet_snapshots():
+    """Ultimo stato noto di ogni foglio, condiviso tra le sessioni:
+    {foglio: {"values": griglia di stringhe, "revision", "taken_at"}}"""
+    return {}
+
+# le risorse condivise si risolvono a ogni run nel thread dello script: i thread in
+# background (refresh della cache, write-behind) usano questi riferimenti e non
+# chiamano mai le API di Streamlit
+SHEET_SNAPSHOTS = get_sheet_snapshots()
+
+def take_snapshot(sheet_name, values, revision):
+    """Registra la griglia appena letta o scritta con la revisione che aveva il foglio"""
+    SHEET_SNAPSHOTS[sheet_name] = {"values": values, "revision": revision, "taken_at": time.time()}
+
+def col_letter(n):
+    """Converte un indice di colonna 0-based nella lettera A1 (0 -> A, 26 -> AA)"""
+    letters = ""
+    n += 1
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        letters = chr(65 + r) + letters
+    return letters
+
+def normalize_grid(values):
+    """Porta una griglia di valori a righe di stringhe tutte della stessa larghezza
+    (l'API omette le celle vuote in coda alle righe)"""
+    width = max((len(r) for r in values), default=0)
+    return [[str(c) for c in r] + [""] * (width - len(r)) for r in values]
+
+def diff_grid_ranges(sheet_name, old, new):
+    """Confronta due griglie normalizzate e restituisce i range A1 da riscrivere.
+
+    Ogni run contiguo di celle cambiate nella stessa riga diventa un range; le celle
+    che esistevano solo nella griglia vecchia vengono svuotate con "".
+    Restituisce (data per values().batchUpdate, numero di celle cambiate)."""
+    n_rows = max(len(old), len(new))
+    n_cols = max(len(old[0]) if old else 0, len(new[0]) if new else 0)
+    data = []
+    changed = 0
+
+    for r in range(n_rows):
+        old_row = old[r] if r < len(old) else []
+        new_row = new[r] if r < len(new) else []
+        if old_row == new_row:
+            continue
 
-        spreadsheet = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-        sheets = spreadsheet.get('sheets', [])
-        sheet_names = [sheet['properties']['title'] for sheet in sheets]
+        run_start = None
+        run_values = []
+        for c in range(n_cols + 1):
+            if c < n_cols:
+                old_val = old_row[c] if c < len(old_row) else ""
+                new_val = new_row[c] if c < len(new_row) else ""
+                is_changed = old_val != new_val
+            else:
+                is_changed = False
+
+            if is_changed:
+                if run_start is None:
+                    run_start = c
+                    run_values = []
+                run_values.append(new_val)
+                changed += 1
+            elif run_start is not None:
+                data.append({
+                    'range': f"{sheet_name}!{col_letter(run_start)}{r + 1}:{col_letter(c - 1)}{r + 1}",
+                    'values': [run_values]
+                })
+                run_start = None
+
+    return data, changed
+
+def page_ranges(sheet_name, rows, first_row=1):
+    """Spezza una griglia in range A1 da al massimo GSHEET_PAGE_ROWS righe"""
+    return [
+        {'range': f"{sheet_name}!A{first_row + start}", 'values': rows[start:start + GSHEET_PAGE_ROWS]}
+        for start in range(0, len(rows), GSHEET_PAGE_ROWS)
+    ]
+
+def full_overwrite_ranges(sheet_name, old, new):
+    """Range che sovrascrivono tutto il foglio, svuotando le celle in eccesso della
+    griglia precedente (niente clear, quindi nessun momento con il foglio vuoto)"""
+    n_rows = max(len(old), len(new))
+    n_cols = max(len(old[0]) if old else 0, len(new[0]) if new else 0)
+    padded = [
+        (new[r] if r < len(new) else []) + [""] * (n_cols - (len(new[r]) if r < len(new) else 0))
+        for r in range(n_rows)
+    ]
+    return page_ranges(sheet_name, padded)
 
-        if sheet_name not in sheet_names:
+# =========================
+# ✅ STORAGE BACKENDS
+# =========================
+# Tutti i backend lavorano su griglie di stringhe (prima riga = intestazione):
+#   sheet_titles() -> fogli esistenti
+#   create_sheet(nome, colonne)
+#   read(nomi) -> {nome: griglia}
+#   read_revisions() -> {nome: revisione}, marcatori inclusi
+#   write_marker(nome, valore)
+#   write(nome, griglia, griglia precedente o None, mode) -> nuova revisione (None se nulla è cambiato)
+class GoogleSheetsBackend:
+    """Storage su Google Sheets; le revisioni stanno nel foglio tecnico META_SHEET.
+
+    Non usa le API di Streamlit, così può lavorare anche dai thread in background.
+    Ogni thread ha il suo client HTTP (httplib2 non è thread-safe) con GSHEET_TIMEOUT."""
+
+    def __init__(self, credentials, spreadsheet_id):
+        self.credentials = credentials
+        self.spreadsheet_id = spreadsheet_id
+        self.service = build('sheets', 'v4', credentials=credentials, cache_discovery=False)
+        self._local = threading.local()
+        self._metadata_lock = threading.Lock()
+        self._sizes = None
+        self._sizes_at = 0
+
+    def _execute(self, request):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=GSHEET_TIMEOUT))
+        return request.execute(http=http)
+
+    def grid_sizes(self, refresh=False):
+        """{foglio: (sheetId, righe, colonne)} della griglia: una sola chiamata di metadati,
+        in cache per GSHEET_METADATA_TTL e aggiornata da _ensure_grid quando la allarga"""
+        with self._metadata_lock:
+            if not refresh and self._sizes is not None and time.time() - self._sizes_at < GSHEET_METADATA_TTL:
+                return dict(self._sizes)
+        result = self._execute(self.service.spreadsheets().get(
+            spreadsheetId=self.spreadsheet_id,
+            fields="sheets.properties(sheetId,title,gridProperties(rowCount,columnCount))"
+        ))
+        sizes = {}
+        for sheet in result.get('sheets', []):
+            props = sheet['properties']
+            grid = props.get('gridProperties', {})
+            sizes[props['title']] = (props['sheetId'], grid.get('rowCount', 0), grid.get('columnCount', 0))
+        with self._metadata_lock:
+            self._sizes, self._sizes_at = sizes, time.time()
+        return dict(sizes)
+
+    def sheet_titles(self):
+        """Nomi dei fogli esistenti (dagli stessi metadati in cache di grid_sizes)"""
+        return list(self.grid_sizes())
+
+    def create_sheet(self, sheet_name, columns):
+        try:
             requests = [{
                 'addSheet': {
                     'properties': {'title': sheet_name}
                 }
             }]
 
-            service.spreadsheets().batchUpdate(
-                spreadsheetId=spreadsheet_id,
+            self._execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
                 body={'requests': requests}
-            ).execute()
+            ))
 
-            values = [columns]
-            service.spreadsheets().values().update(
-                spreadsheetId=spreadsheet_id,
+            self._execute(self.service.spreadsheets().values().update(
+                spreadsheetId=self.spreadsheet_id,
                 range=f"{sheet_name}!A1",
                 valueInputOption='RAW',
-                body={'values': values}
-            ).execute()
+                body={'values': [columns]}
+            ))
+        finally:
+            with self._metadata_lock:
+                self._sizes = None
+
+    def read_pages(self, sheet_names):
+        """Legge i fogli a pagine di GSHEET_PAGE_ROWS righe (range di sole righe, tutte le
+        colonne) e restituisce i blocchi man mano che arrivano: (foglio, prima riga, righe).
+        Ogni pagina è una batchGet con un blocco per ciascun foglio ancora aperto; un foglio
+        si chiude oltre le righe note della griglia, a meno che l'ultima pagina fosse piena
+        (la griglia può essere cresciuta dopo l'ultima lettura dei metadati)."""
+        known_rows = {name: size[1] for name, size in self.grid_sizes().items()}
+        names = list(sheet_names)
+        start = 1
+        while names:
+            end = start + GSHEET_PAGE_ROWS - 1
+            result = self._execute(self.service.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=[f"{name}!{start}:{end}" for name in names]
+            ))
+            still_open = []
+            for name, value_range in zip(names, result.get('valueRanges', [])):
+                block = value_range.get('values', [])
+                yield name, start, block
+                if len(block) == GSHEET_PAGE_ROWS or end < known_rows.get(name, 0):
+                    still_open.append(name)
+            names = still_open
+            start = end + 1
+
+    def read(self, sheet_names):
+        grids = {name: [] for name in sheet_names}
+        for name, start, block in self.read_pages(sheet_names):
+            if block:
+                grid = grids[name]
+                # l'API omette le righe vuote in coda al blocco precedente
+                grid.extend([] for _ in range(start - 1 - len(grid)))
+                grid.extend(block)
+        return grids
+
+    def read_revisions(self):
+        if META_SHEET not in self.sheet_titles():
+            return {}
+        result = self._execute(self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"{META_SHEET}!A2:B"
+        ))
+        return {row[0]: row[1] for row in result.get('values', []) if len(row) >= 2}
+
+    def write_marker(self, name, value):
+        row = META_MARKER_ROWS[name]
+        if META_SHEET not in self.sheet_titles():
+            self.create_sheet(META_SHEET, META_COLUMNS)
+        self._execute(self.service.spreadsheets().values().update(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"{META_SHEET}!A{row}:B{row}",
+            valueInputOption='RAW',
+            body={'values': [[name, value]]}
+        ))
+
+    def _revision_range(self, sheet_name, revision):
+        """Range di META_SHEET con la revisione del foglio (None se il foglio non è tracciato)"""
+        row = REVISION_ROWS.get(sheet_name)
+        if row is None:
+            return None
+        if META_SHEET not in self.sheet_titles():
+            self.create_sheet(META_SHEET, META_COLUMNS)
+        return {'range': f"{META_SHEET}!A{row}:B{row}", 'values': [[sheet_name, revision]]}
+
+    def _ensure_grid(self, sheet_name, n_rows, n_cols):
+        """Allarga la griglia del foglio se i valori da scrivere non ci stanno. Le dimensioni
+        in cache si riverificano solo quando la scrittura va oltre"""
+        sheet_id, grid_rows, grid_cols = self.grid_sizes()[sheet_name]
+        if n_rows <= grid_rows and n_cols <= grid_cols:
+            return
+        sheet_id, grid_rows, grid_cols = self.grid_sizes(refresh=True)[sheet_name]
+        requests = []
+        if n_rows > grid_rows:
+            requests.append({'appendDimension': {'sheetId': sheet_id, 'dimension': 'ROWS', 'length': n_rows - grid_rows}})
+        if n_cols > grid_cols:
+            requests.append({'appendDimension': {'sheetId': sheet_id, 'dimension': 'COLUMNS', 'length': n_cols - grid_cols}})
+        if requests:
+            self._execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'requests': requests}
+            ))
+            with self._metadata_lock:
+                if self._sizes is not None:
+                    self._sizes[sheet_name] = (sheet_id, max(n_rows, grid_rows), max(n_cols, grid_cols))
+
+    def write(self, sheet_name, values, previous, mode):
+        """In modalità "delta" invia solo i range cambiati; la revisione in META_SHEET
+        viaggia nell'ultima values().batchUpdate, così cambia solo a scrittura completata.
+        Le griglie grandi partono a pagine di GSHEET_PAGE_ROWS righe."""
+        _, grid_rows, grid_cols = self.grid_sizes()[sheet_name]
+        width = len(values[0]) if values else 0
+        tail_ranges = []
+
+        if mode == "delta" and previous is not None:
+            data, changed = diff_grid_ranges(sheet_name, previous, values)
+            total_cells = max(len(values) * width, 1)
+            if changed / total_cells > DELTA_FULL_REWRITE_RATIO:
+                data = full_overwrite_ranges(sheet_name, previous, values)
+        else:
+            data = page_ranges(sheet_name, values)
+            # svuota quello che resta oltre la nuova griglia, fino ai bordi del foglio (dai
+            # metadati in cache o, se più grande, dalla griglia letta l'ultima volta)
+            if previous:
+                grid_rows = max(grid_rows, len(previous))
+                grid_cols = max(grid_cols, len(previous[0]))
+            last_col = col_letter(max(grid_cols, 1) - 1)
+            if grid_rows > len(values):
+                tail_ranges.append(f"{sheet_name}!A{len(values) + 1}:{last_col}{grid_rows}")
+            if values and grid_cols > width:
+                tail_ranges.append(f"{sheet_name}!{col_letter(width)}1:{last_col}{len(values)}")
+
+        if not data and not tail_ranges:
+            return None
+
+        self._ensure_grid(sheet_name, len(values), width)
+
+        revision = str(time.time_ns())
+        revision_range = self._revision_range(sheet_name, revision)
+
+        batches = [[]]
+        batch_rows = 0
+        for item in data:
+            if batch_rows and batch_rows + len(item['values']) > GSHEET_PAGE_ROWS:
+                batches.append([])
+                batch_rows = 0
+            batches[-1].append(item)
+            batch_rows += len(item['values'])
+        if revision_range is not None:
+            batches[-1].append(revision_range)
+
+        if tail_ranges:
+            self._execute(self.service.spreadsheets().values().batchClear(
+                spreadsheetId=self.spreadsheet_id,
+                body={'ranges': tail_ranges}
+            ))
+
+        for batch in batches:
+            if batch:
+                self._execute(self.service.spreadsheets().values().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={'valueInputOption': 'RAW', 'data': batch}
+                ))
+        return revision
+
+class SQLiteBackend:
+    """Storage su file SQLite locale: una riga JSON per ogni riga del foglio"""
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheet_rows ("
+                "sheet TEXT NOT NULL, row_idx INTEGER NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (sheet, row_idx))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheet_meta (sheet TEXT PRIMARY KEY, revision TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta_markers (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=15, check_same_thread=False)
+
+    def sheet_titles(self):
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute("SELECT sheet FROM sheet_meta")]
+
+    def create_sheet(self, sheet_name, columns):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sheet_rows (sheet, row_idx, data) VALUES (?, 0, ?)",
+                (sheet_name, json.dumps(list(columns)))
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO sheet_meta (sheet, revision) VALUES (?, ?)",
+                (sheet_name, str(time.time_ns()))
+            )
+
+    def read(self, sheet_names):
+        grids = {name: [] for name in sheet_names}
+        with closing(self._connect()) as conn:
+            placeholders = ",".join("?" * len(sheet_names))
+            rows = conn.execute(
+                f"SELECT sheet, data FROM sheet_rows WHERE sheet IN ({placeholders}) ORDER BY sheet, row_idx",
+                tuple(sheet_names)
+            )
+            for sheet, data in rows:
+                grids[sheet].append(json.loads(data))
+        return grids
+
+    def read_revisions(self):
+        with closing(self._connect()) as conn:
+            revisions = dict(conn.execute("SELECT sheet, revision FROM sheet_meta"))
+            revisions.update(conn.execute("SELECT name, value FROM meta_markers"))
+            return revisions
+
+    def write_marker(self, name, value):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO meta_markers (name, value) VALUES (?, ?)", (name, value))
+
+    def write(self, sheet_name, values, previous, mode):
+        """In modalità "delta" riscrive solo le righe cambiate"""
+        if mode == "delta" and previous is not None:
+            changed_rows = [
+                (i, row) for i, row in enumerate(values)
+                if i >= len(previous) or previous[i] != row
+            ]
+            if not changed_rows and len(values) == len(previous):
+                return None
+        else:
+            changed_rows = list(enumerate(values))
+
+        revision = str(time.time_ns())
+        with closing(self._connect()) as conn, conn:
+            if not (mode == "delta" and previous is not None):
+                conn.execute("DELETE FROM sheet_rows WHERE sheet = ?", (sheet_name,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO sheet_rows (sheet, row_idx, data) VALUES (?, ?, ?)",
+                [(sheet_name, i, json.dumps(row)) for i, row in changed_rows]
+            )
+            conn.execute(
+                "DELETE FROM sheet_rows WHERE sheet = ? AND row_idx >= ?",
+                (sheet_name, len(values))
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sheet_meta (sheet, revision) VALUES (?, ?)",
+                (sheet_name, revision)
+            )
+        return revision
+
+@st.cache_resource
+def get_storage_backend():
+    """Backend di storage scelto da STORAGE_BACKEND"""
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteBackend(SQLITE_PATH)
+    return GoogleSheetsBackend(get_gsheet_credentials(), st.secrets["spreadsheet_id"])
+
+STORAGE = get_storage_backend()
 
+def create_sheet_if_not_exists(sheet_name, columns):
+    """Crea un nuovo foglio se non esiste"""
+    try:
+        if sheet_name not in STORAGE.sheet_titles():
+            STORAGE.create_sheet(sheet_name, columns)
+            take_snapshot(sheet_name, normalize_grid([columns]), None)
             return True
         return False
     except Exception as e:
         st.error(f"Errore nella creazione del foglio: {e}")
         return False
 
-def save_to_gsheet(df, sheet_name):
-    """Salva DataFrame su Google Sheets - VERSIONE STABILE"""
+def fetch_sheet_revisions():
+    """Revisioni correnti di tutti i fogli ({foglio: revisione}) con una sola lettura.
+    In caso di errore restituisce None (si ricarica tutto)."""
+    try:
+        return STORAGE.read_revisions()
+    except Exception:
+        return None
+
+def encode_column(series, is_date=False):
+    """Serializza una colonna in stringhe in un solo passaggio vettoriale. In una colonna
+    data rimasta object si formattano solo i valori che sono date, gli altri restano testo"""
+    if is_date and series.dtype == object:
+        return np.array([
+            "" if pd.isna(v) else v.strftime('%Y-%m-%d %H:%M:%S') if isinstance(v, (datetime, date)) else str(v)
+            for v in series.to_numpy(dtype=object)
+        ], dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime('%Y-%m-%d %H:%M:%S').fillna('').to_numpy(dtype=object)
+    if series.dtype == 'bool':
+        return np.where(series.to_numpy(), 'True', 'False').astype(object)
+    values = series.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    encoded = values.astype(str).astype(object)
+    encoded[missing] = ''
+    return encoded
+
+def dataframe_to_values(df, sheet_name=None):
+    """Serializza il DataFrame nella griglia di stringhe da scrivere (intestazione inclusa).
+    Le colonne data dichiarate nello schema del foglio si formattano come date anche se object."""
+    schema = SHEET_SPECS[sheet_name]["schema"] if sheet_name in SHEET_SPECS else {}
+    date_cols = {col for col, spec in schema.items() if spec["kind"] == "date"}
+    header = [str(col) for col in df.columns]
+    if len(df) == 0:
+        return [header]
+    columns = [encode_column(df.iloc[:, i], df.columns[i] in date_cols) for i in range(df.shape[1])]
+    return [header] + np.column_stack(columns).tolist()
+
+def delta_baseline(sheet_name):
+    """Griglia su cui calcolare il delta: lo snapshot, ma solo se il foglio ha ancora la
+    revisione dello snapshot (qualcun altro può averlo scritto nel frattempo) e lo snapshot
+    non è più vecchio di REVISION_FULL_RELOAD. Altrimenti None: riscrittura completa."""
+    snapshot = SHEET_SNAPSHOTS.get(sheet_name)
+    if snapshot is None or snapshot["revision"] is None:
+        return None
+    if time.time() - snapshot["taken_at"] >= REVISION_FULL_RELOAD:
+        return None
+    revisions = fetch_sheet_revisions()
+    if not revisions or revisions.get(sheet_name) != snapshot["revision"]:
+        return None
+    return snapshot["values"]
+
+def write_values(sheet_name, values, mode=None, update_cache=True):
+    """Scrive una griglia già serializzata e aggiorna snapshot e (se richiesto) cache;
+    restituisce la nuova revisione e solleva in caso di errore"""
+    mode = mode or GSHEET_WRITE_MODE
+    snapshot = SHEET_SNAPSHOTS.get(sheet_name)
+    if mode == "delta":
+        previous = delta_baseline(sheet_name)
+    else:
+        # nella riscrittura completa la griglia precedente serve solo a svuotare la coda
+        previous = snapshot["values"] if snapshot is not None else None
+    revision = STORAGE.write(sheet_name, values, previous, mode)
+    if revision is None and previous is not None:
+        # nessuna cella cambiata: il foglio ha ancora la revisione dello snapshot
+        revision = snapshot["revision"]
+    take_snapshot(sheet_name, values, revision)
+    if update_cache:
+        update_cached_sheet(sheet_name, values, revision)
+    return revision
+
+def save_to_gsheet(df, sheet_name, mode=None):
+    """Salva DataFrame su Google Sheets - VERSIONE STABILE
+
+    In modalità "delta" il backend riceve anche l'ultimo stato noto del foglio e
+    scrive solo ciò che è cambiato. Se lo stato del foglio non è noto si usa la
+    riscrittura completa. Ogni scrittura aggiorna anche la revisione del foglio.
+    Con WRITE_BEHIND attivo la scrittura viene solo accodata (vedi enqueue_write)."""
+    if WRITE_BEHIND:
+        enqueue_write(sheet_name, dataframe_to_values(df, sheet_name), mode)
+        return True
+
     max_retries = 3
     retry_count = 0
 
     while retry_count < max_retries:
         try:
-            service = get_gsheet_service()
-            spreadsheet_id = st.secrets["spreadsheet_id"]
-
-            socket.setdefaulttimeout(15)
-
-            df_copy = df.copy()
-
-            for col in df_copy.columns:
-                if pd.api.types.is_datetime64_any_dtype(df_copy[col]):
-                    df_copy[col] = df_copy[col].apply(
-                        lambda x: x.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(x) else ''
-                    )
-                elif df_copy[col].dtype == 'bool':
-                    df_copy[col] = df_copy[col].apply(lambda x: 'True' if x else 'False')
-                else:
-                    df_copy[col] = df_copy[col].apply(lambda x: '' if pd.isna(x) else str(x))
-
-            values = [df_copy.columns.tolist()] + df_copy.values.tolist()
-
-            service.spreadsheets().values().clear(
-                spreadsheetId=spreadsheet_id,
-                range=f"{sheet_name}!A1:ZZ10000"
-            ).execute()
-
-            time.sleep(0.3)
-
-            service.spreadsheets().values().update(
-                spreadsheetId=spreadsheet_id,
-                range=f"{sheet_name}!A1",
-                valueInputOption='RAW',
-                body={'values': values}
-            ).execute()
-
-            st.cache_data.clear()
+            write_values(sheet_name, dataframe_to_values(df, sheet_name), mode)
             return True
 
         except socket.timeout:
@@ -167,58 +723,291 @@ def save_to_gsheet(df, sheet_name):
 
     return False
 
-def load_from_gsheet(sheet_name, columns, date_cols=None):
-    """Carica DataFrame da Google Sheets - VERSIONE OTTIMIZZATA"""
+# =========================
+# ✅ WRITE-BEHIND (scritture in background, accorpate per foglio)
+# =========================
+# Con WRITE_BEHIND attivo save_to_gsheet accoda la griglia e torna subito; un thread
+# scrive ogni foglio quando le modifiche si fermano per WRITE_BEHIND_DELAY secondi
+# (al massimo dopo WRITE_BEHIND_MAX_DELAY). Più salvataggi dello stesso foglio nel
+# frattempo diventano una sola scrittura: vince l'ultima griglia.
+# Le modifiche ancora in coda si perdono se il server si ferma prima del flush; se il
+# flush fallisce anche all'ultimo tentativo il foglio esce dalla cache (si rilegge quello
+# remoto) e l'errore resta visibile in render_write_status.
+WRITE_BEHIND = str(get_storage_setting("write_behind", "false")).lower() in ["true", "1", "yes", "on"]
+WRITE_BEHIND_DELAY = 1.5
+WRITE_BEHIND_MAX_DELAY = 5
+WRITE_BEHIND_MAX_ATTEMPTS = 3
+
+@st.cache_resource
+def get_write_queue():
+    """Coda condivisa: {"cond", "pending": {foglio: {...}}, "status": {foglio: {...}},
+    "seq": {foglio: numero dell'ultima griglia accodata}, "thread"}"""
+    return {"cond": threading.Condition(), "pending": {}, "status": {}, "seq": {}, "thread": None}
+
+WRITE_QUEUE = get_write_queue()
+
+def enqueue_write(sheet_name, values, mode=None):
+    """Accoda la griglia del foglio (sostituendo quella eventualmente in attesa) e
+    aggiorna subito la cache, così le letture successive vedono già la modifica"""
+    queue = WRITE_QUEUE
+    now = time.time()
+    with queue["cond"]:
+        # la cache si aggiorna sotto il lock della coda, prima che il worker possa
+        # scrivere (o scartare) questa griglia
+        update_cached_sheet(sheet_name, values)
+        entry = queue["pending"].get(sheet_name)
+        queue["seq"][sheet_name] = queue["seq"].get(sheet_name, 0) + 1
+        queue["pending"][sheet_name] = {
+            "seq": queue["seq"][sheet_name],
+            "values": values,
+            "mode": mode,
+            "first_at": entry["first_at"] if entry else now,
+            "last_at": now,
+            "mutations": (entry["mutations"] if entry else 0) + 1,
+            "attempts": 0,
+        }
+        queue["status"][sheet_name] = {"state": "pending", "at": now, "mutations": queue["pending"][sheet_name]["mutations"]}
+        if queue["thread"] is None or not queue["thread"].is_alive():
+            queue["thread"] = threading.Thread(target=_write_behind_worker, daemon=True)
+            queue["thread"].start()
+        queue["cond"].notify()
+
+def get_pending_values(sheet_name):
+    """Griglia in attesa di scrittura per il foglio (None se non ce ne sono)"""
+    queue = WRITE_QUEUE
+    with queue["cond"]:
+        entry = queue["pending"].get(sheet_name)
+        return entry["values"] if entry else None
+
+def _write_behind_worker():
+    queue = WRITE_QUEUE
+    while True:
+        with queue["cond"]:
+            while True:
+                now = time.time()
+                due = [
+                    name for name, entry in queue["pending"].items()
+                    if now - entry["last_at"] >= WRITE_BEHIND_DELAY or now - entry["first_at"] >= WRITE_BEHIND_MAX_DELAY
+                ]
+                if due:
+                    break
+                queue["cond"].wait(timeout=0.5 if queue["pending"] else None)
+            batch = {name: queue["pending"].pop(name) for name in due}
+
+        for name, entry in batch.items():
+            try:
+                revision = write_values(name, entry["values"], entry["mode"], update_cache=False)
+                state = {"state": "flushed", "at": time.time(), "mutations": entry["mutations"]}
+            except Exception as e:
+                revision = None
+                entry["attempts"] += 1
+                state = {"state": "error", "at": time.time(), "mutations": entry["mutations"], "error": str(e)}
+            with queue["cond"]:
+                # una griglia più recente in coda per lo stesso foglio ha la precedenza:
+                # è già in cache e non va sovrascritta con questa
+                newer = name in queue["pending"] and queue["pending"][name]["seq"] > entry["seq"]
+                if state["state"] == "flushed":
+                    if not newer:
+                        update_cached_sheet(name, entry["values"], revision)
+                elif entry["attempts"] < WRITE_BEHIND_MAX_ATTEMPTS:
+                    if not newer:
+                        entry["last_at"] = time.time()
+                        queue["pending"][name] = entry
+                        state["state"] = "pending"
+                elif not newer:
+                    # fallito per sempre: la cache (e lo snapshot) contengono modifiche mai
+                    # salvate, quindi il foglio si rilegge al prossimo accesso
+                    drop_cached_sheet(name)
+                if not newer:
+                    queue["status"][name] = state
+
+def render_write_status(sheet_names):
+    """Stato delle scritture in background per i fogli della sezione"""
+    if not WRITE_BEHIND:
+        return
+    queue = WRITE_QUEUE
+    with queue["cond"]:
+        statuses = [(name, dict(queue["status"][name])) for name in sheet_names if name in queue["status"]]
+    for name, status in statuses:
+        at = datetime.fromtimestamp(status["at"]).strftime('%H:%M:%S')
+        if status["state"] == "pending":
+            st.caption(f"⏳ {name}: {status['mutations']} modifiche in attesa di salvataggio")
+        elif status["state"] == "flushed":
+            st.caption(f"💾 {name}: salvato alle {at}")
+        else:
+            st.error(f"❌ {name}: salvataggio non riuscito alle {at}, {status['mutations']} modifiche perse ({status.get('error', '')})")
+
+def pause_before_rerun(seconds):
+    """Pausa per lasciare visibile il messaggio di conferma; inutile con WRITE_BEHIND"""
+    if not WRITE_BEHIND:
+        time.sleep(seconds)
+
+def _parse_text(series, spec):
+    return series.fillna(spec["default"]).astype(str)
+
+def _parse_date(series, spec):
+    return pd.to_datetime(series, errors='coerce').astype("datetime64[ns]")
+
+def _parse_int(series, spec):
+    return pd.to_numeric(series, errors='coerce').fillna(0).astype(int)
+
+def _parse_bool(series, spec):
+    return series.astype(str).str.lower().isin(['true', '1', 'yes'])
+
+def _parse_status(series, spec):
+    return clean_status_series(series)
+
+def _parse_choice(series, spec):
+    values = series.fillna("").astype(str).str.strip()
+    values = values.where(values != "", spec["default"])
+    extra = sorted(set(values.unique()) - set(spec["allowed"]))
+    return values.astype(pd.CategoricalDtype(spec["allowed"] + extra))
+
+def _parse_category(series, spec):
+    values = series.fillna(spec["default"]).astype(str)
+    extra = sorted(set(values.unique()) - set(spec["allowed"]))
+    return values.astype(pd.CategoricalDtype(spec["allowed"] + extra))
+
+SCHEMA_PARSERS = {
+    "text": _parse_text,
+    "key": _parse_text,
+    "date": _parse_date,
+    "int": _parse_int,
+    "bool": _parse_bool,
+    "status": _parse_status,
+    "choice": _parse_choice,
+    "category": _parse_category,
+}
+
+SCHEMA_EMPTY_DTYPES = {"date": "datetime64[ns]", "int": "int64", "bool": "bool"}
+
+def schema_dtype(spec):
+    """dtype pandas della colonna (senza le eventuali categorie extra di "category")"""
+    if spec["kind"] == "status":
+        return STATUS_DTYPE
+    if spec["kind"] in ("choice", "category"):
+        return pd.CategoricalDtype(spec["allowed"])
+    return SCHEMA_EMPTY_DTYPES.get(spec["kind"], "object")
+
+def schema_key_column(schema):
+    return next((col for col, spec in schema.items() if spec["kind"] == "key"), None)
+
+def empty_frame(schema):
+    """DataFrame vuoto con le colonne e i tipi dello schema"""
+    return pd.DataFrame({
+        col: pd.Series(dtype=schema_dtype(spec))
+        for col, spec in schema.items()
+    })
+
+def values_to_dataframe(values, schema):
+    """Converte la griglia di valori letta dal foglio in un DataFrame tipizzato secondo lo
+    schema: un solo passaggio vettoriale per colonna. Le colonne non dichiarate
+    (ad esempio i mesi EOM) restano come lette."""
+    if not values or len(values) < 2:
+        return empty_frame(schema)
+
+    df = pd.DataFrame(values[1:], columns=values[0])
+
+    for col, spec in schema.items():
+        if col in df.columns:
+            df[col] = SCHEMA_PARSERS[spec["kind"]](df[col], spec)
+        elif spec["kind"] == "date":
+            df[col] = pd.Timestamp.now() if spec["default"] == "now" else pd.NaT
+        elif spec["kind"] == "int" and spec["default"] is None:
+            df[col] = range(len(df))
+        else:
+            df[col] = SCHEMA_PARSERS[spec["kind"]](pd.Series(spec["default"], index=df.index), spec)
+
+    key_col = schema_key_column(schema)
+    if key_col is not None:
+        # indice chiave -> riga: .loc/.at sulla chiave è una ricerca hash, anche su viste filtrate
+        df.index = pd.Index(df[key_col].to_numpy(dtype=object))
+
+    return df
+
+def read_sheet(sheet_name):
+    """Foglio fresco, senza cache: la griglia in attesa di write-behind se c'è, altrimenti
+    una lettura dal backend (fetch_frames). Solleva in caso di errore, senza messaggi"""
+    pending = get_pending_values(sheet_name)
+    if pending is not None:
+        return values_to_dataframe(pending, SHEET_SPECS[sheet_name]["schema"])
+    return fetch_frames((sheet_name,))[sheet_name]
+
+def load_from_gsheet(sheet_name, required=False):
+    """Carica DataFrame da Google Sheets - VERSIONE OTTIMIZZATA
+
+    Se la lettura fallisce anche dopo i tentativi restituisce un foglio vuoto, oppure
+    None con required=True: chi poi salva il foglio intero deve fermarsi, non
+    sovrascriverlo con un foglio vuoto."""
+    schema = SHEET_SPECS[sheet_name]["schema"]
+    failed = None if required else empty_frame(schema)
     max_retries = 3
     retry_count = 0
 
     while retry_count < max_retries:
         try:
-            service = get_gsheet_service()
-            spreadsheet_id = st.secrets["spreadsheet_id"]
-
-            socket.setdefaulttimeout(15)
-
-            result = service.spreadsheets().values().get(
-                spreadsheetId=spreadsheet_id,
-                range=f"{sheet_name}!A:ZZ"
-            ).execute()
-
-            values = result.get('values', [])
-
-            if not values or len(values) < 2:
-                df = pd.DataFrame(columns=columns)
-                if "Order" in columns:
-                    df["Order"] = []
-                return df
-
-            df = pd.DataFrame(values[1:], columns=values[0])
-
-            for col in columns:
-                if col not in df.columns:
-                    if col in ["Release Date", "Due Date", "Last Update", "Last Done"]:
-                        df[col] = pd.NaT
-                    elif col == "Order":
-                        df[col] = range(len(df))
-                    elif col == "🗑️ Delete":
-                        df[col] = False
-                    else:
-                        df[col] = ""
-
-            if date_cols:
-                for col in date_cols:
-                    if col in df.columns:
-                        df[col] = pd.to_datetime(df[col], errors='coerce')
+            return read_sheet(sheet_name)
 
-            if "Order" in df.columns:
-                df["Order"] = pd.to_numeric(df["Order"], errors='coerce').fillna(0).astype(int)
-
-            if "🗑️ Delete" in df.columns:
-                df["🗑️ Delete"] = df["🗑️ Delete"].apply(
-                    lambda x: True if str(x).lower() in ['true', '1', 'yes'] else False
-                )
+        except socket.timeout:
+            retry_count += 1
+            if retry_count < max_retries:
+                st.warning(f"⏱️ Timeout caricamento - tentativo {retry_count}/{max_retries}...")
+                time.sleep(2)
+                continue
+            else:
+                st.error("❌ Timeout: impossibile caricare i dati da Google Sheets")
+                return failed
+        except Exception as e:
+            retry_count += 1
+            if retry_count < max_retries:
+                time.sleep(1)
+                continue
+            else:
+                st.error(f"❌ Errore nel caricamento dopo {max_retries} tentativi: {e}")
+                return failed
+
+    return failed
+
+def fetch_frames(sheet_names, background=False, revisions=None):
+    """Legge più fogli con una sola lettura (su Google Sheets una values().batchGet) e
+    restituisce {nome foglio: DataFrame}; solleva in caso di errore, senza messaggi.
+
+    L'esistenza dei fogli si verifica dai metadati in cache (sheet_titles): i fogli
+    mancanti con create=True in SHEET_SPECS vengono creati, gli altri tornano vuoti.
+    Con background=True (refresh dal thread della cache) non crea fogli, salta quelli
+    mancanti e non aggiorna gli snapshot usati dalle scritture delta. revisions sono le
+    revisioni lette prima dei dati (se mancano si leggono qui) e finiscono negli snapshot."""
+    titles = STORAGE.sheet_titles()
+    to_fetch = [name for name in sheet_names if name in titles]
+    frames = {}
+    if not background:
+        for name in sheet_names:
+            if name not in titles:
+                if SHEET_SPECS[name].get("create"):
+                    create_sheet_if_not_exists(name, list(SHEET_SPECS[name]["schema"]))
+                frames[name] = empty_frame(SHEET_SPECS[name]["schema"])
+
+    if not to_fetch:
+        return frames
+
+    if revisions is None and not background:
+        revisions = fetch_sheet_revisions() or {}
+    grids = STORAGE.read(to_fetch)
+    for name in to_fetch:
+        values = grids[name]
+        if not background:
+            take_snapshot(name, normalize_grid(values), revisions.get(name))
+        frames[name] = values_to_dataframe(values, SHEET_SPECS[name]["schema"])
+    return frames
+
+def batch_load_from_gsheet(sheet_names, revisions=None):
+    """fetch_frames con i tentativi e i messaggi per l'utente; in caso di errore None"""
+    max_retries = 3
+    retry_count = 0
 
-            return df
+    while retry_count < max_retries:
+        try:
+            return fetch_frames(sheet_names, revisions=revisions)
 
         except socket.timeout:
             retry_count += 1
@@ -228,7 +1017,7 @@ def load_from_gsheet(sheet_name, columns, date_cols=None):
                 continue
             else:
                 st.error("❌ Timeout: impossibile caricare i dati da Google Sheets")
-                return pd.DataFrame(columns=columns)
+                return None
         except Exception as e:
             retry_count += 1
             if retry_count < max_retries:
@@ -236,80 +1025,239 @@ def load_from_gsheet(sheet_name, columns, date_cols=None):
                 continue
             else:
                 st.error(f"❌ Errore nel caricamento dopo {max_retries} tentativi: {e}")
-                return pd.DataFrame(columns=columns)
+                return None
 
-    return pd.DataFrame(columns=columns)
+    return None
 
 # =========================
 # LOAD DATA CON CACHE
 # =========================
-@st.cache_data(ttl=30)
+SHEET_SPECS = {
+    "Projects": {"schema": PROJECT_SCHEMA, "create": False},
+    "EOM": {"schema": EOM_BASE_SCHEMA, "create": False},
+    EOM_DESCRIPTIONS_SHEET: {"schema": EOM_DESCRIPTIONS_SCHEMA, "create": True},
+    ADHOC_SHEET_NAME: {"schema": ADHOC_SCHEMA, "create": True},
+    ADHOC_DESCRIPTIONS_SHEET: {"schema": ADHOC_DESCRIPTIONS_SCHEMA, "create": True},
+    EOM_STATUS_SHEET: {"schema": EOM_STATUS_SCHEMA, "create": True},
+    EOM_ARCHIVE_SHEET: {"schema": EOM_STATUS_SCHEMA, "create": True},
+}
+
+# riga di ogni foglio in META_SHEET (la riga 1 è l'intestazione)
+REVISION_ROWS = {name: i + 2 for i, name in enumerate(SHEET_SPECS)}
+META_MARKER_ROWS = {EOM_ROLLOVER_MARKER: len(REVISION_ROWS) + 2}
+
+# ✅ Fogli necessari per ogni sezione: si caricano solo quelli della sezione visualizzata
+SECTION_SHEETS = {
+    "Projects": ("Projects",),
+    "EOM": ("EOM", EOM_STATUS_SHEET, EOM_DESCRIPTIONS_SHEET),
+    "AdHoc": (ADHOC_SHEET_NAME, ADHOC_DESCRIPTIONS_SHEET),
+}
+
+# =========================
+# ✅ CACHE PER FOGLIO (invalidazione mirata + stale-while-revalidate)
+# =========================
+# "swr": oltre "refresh" secondi si serve subito il dato in cache e lo si aggiorna in
+# un thread in background; oltre "max_stale" secondi il caricamento torna bloccante.
+# "ttl": caricamento bloccante appena scade "refresh" (comportamento originale)
+SHEET_CACHE_MODE = "swr"
+DEFAULT_CACHE_POLICY = {"refresh": 30, "max_stale": 600}
+SHEET_CACHE_POLICY = {
+    "Projects": {"refresh": 30, "max_stale": 300},
+    "EOM": {"refresh": 30, "max_stale": 300},
+    EOM_DESCRIPTIONS_SHEET: {"refresh": 120, "max_stale": 1800},
+    ADHOC_SHEET_NAME: {"refresh": 30, "max_stale": 300},
+    ADHOC_DESCRIPTIONS_SHEET: {"refresh": 120, "max_stale": 1800},
+    EOM_STATUS_SHEET: {"refresh": 30, "max_stale": 300},
+    EOM_ARCHIVE_SHEET: {"refresh": 300, "max_stale": 3600},
+}
+
+# dopo questo tempo si riscarica comunque, anche a revisione invariata (modifiche fatte
+# a mano dall'interfaccia di Google Sheets non aggiornano la revisione)
+REVISION_FULL_RELOAD = 900
+
+# memo della singola esecuzione dello script: Streamlit riesegue il modulo a ogni rerun,
+# quindi si azzera da solo. Letture ripetute dello stesso foglio nello stesso run
+# passano dalla cache (e dalla rete) una volta sola.
+RUN_MEMO = {}
+
+@st.cache_resource
+def get_sheet_cache():
+    """Cache dei DataFrame per foglio, condivisa tra le sessioni:
+    {foglio: {"df", "loaded_at", "downloaded_at", "revision"}}"""
+    return {}
+
+@st.cache_resource
+def get_sheet_cache_lock():
+    return threading.Lock()
+
+@st.cache_resource
+def get_refreshing_sheets():
+    """Fogli con un refresh in background in corso"""
+    return set()
+
+@st.cache_resource
+def get_refresh_errors():
+    """{foglio: errore} dei refresh in background falliti, da mostrare nel run successivo"""
+    return {}
+
+SHEET_CACHE = get_sheet_cache()
+SHEET_CACHE_LOCK = get_sheet_cache_lock()
+REFRESHING_SHEETS = get_refreshing_sheets()
+REFRESH_ERRORS = get_refresh_errors()
+
+def _cache_frame(sheet_name, df, revision=None, fetched_at=None):
+    """Mette in cache il DataFrame del foglio. Con fetched_at (refresh in background)
+    non sovrascrive una versione più recente, ad esempio scritta nel frattempo"""
+    with SHEET_CACHE_LOCK:
+        current = SHEET_CACHE.get(sheet_name)
+        if fetched_at is not None and current is not None and current["loaded_at"] > fetched_at:
+            return
+        loaded_at = fetched_at or time.time()
+        SHEET_CACHE[sheet_name] = {"df": df, "loaded_at": loaded_at, "downloaded_at": loaded_at, "revision": revision}
+
+def _reload_sheets(sheet_names, background=False):
+    """Ricarica i fogli scaduti: confronta prima le revisioni in META_SHEET e scarica
+    (in un'unica batchGet) solo i fogli cambiati; agli altri rinnova solo la scadenza.
+    Con background=True non usa le API di Streamlit: un errore di lettura viene
+    restituito (stringa) invece di essere mostrato."""
+    fetched_at = time.time()
+    revisions = fetch_sheet_revisions()
+
+    to_download = []
+    for name in sheet_names:
+        entry = SHEET_CACHE.get(name)
+        revision = revisions.get(name) if revisions else None
+        # con una scrittura in coda la cache è già più aggiornata del foglio remoto
+        pending_write = entry is not None and get_pending_values(name) is not None
+        unchanged = pending_write or (
+            entry is not None
+            and revision is not None
+            and entry["revision"] == revision
+            and fetched_at - entry["downloaded_at"] < REVISION_FULL_RELOAD
+        )
+        if unchanged:
+            with SHEET_CACHE_LOCK:
+                entry["loaded_at"] = max(entry["loaded_at"], fetched_at)
+        else:
+            to_download.append(name)
+
+    if not to_download:
+        return None
+
+    if background:
+        try:
+            frames = fetch_frames(tuple(to_download), background=True)
+        except Exception as e:
+            return str(e) or type(e).__name__
+    else:
+        frames = batch_load_from_gsheet(tuple(to_download), revisions or {})
+        if frames is None:
+            # lettura fallita: niente in cache sotto la revisione appena letta, altrimenti i
+            # reload successivi la troverebbero invariata e servirebbero un foglio vuoto fino
+            # a REVISION_FULL_RELOAD. I fogli già in cache restano (scaduti: si riprova al
+            # prossimo accesso), gli altri ricevono un foglio vuoto senza revisione, già scaduto
+            with SHEET_CACHE_LOCK:
+                for name in to_download:
+                    if name not in SHEET_CACHE:
+                        SHEET_CACHE[name] = {"df": empty_frame(SHEET_SPECS[name]["schema"]), "loaded_at": 0, "downloaded_at": 0, "revision": None}
+            return None
+    for name, df in frames.items():
+        revision = revisions.get(name) if revisions else None
+        _cache_frame(name, df, revision, fetched_at=fetched_at if background else None)
+    return None
+
+def _refresh_sheets_in_background(sheet_names):
+    try:
+        error = _reload_sheets(sheet_names, background=True)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    with SHEET_CACHE_LOCK:
+        if error:
+            REFRESH_ERRORS.update({name: error for name in sheet_names})
+        REFRESHING_SHEETS.difference_update(sheet_names)
+
+def get_cached_sheets(sheet_names):
+    """DataFrame dei fogli richiesti (copie), letti al più una volta per run"""
+    missing = tuple(name for name in sheet_names if name not in RUN_MEMO)
+    if missing:
+        RUN_MEMO.update(_get_cached_sheets(missing))
+    return {name: RUN_MEMO[name].copy() for name in sheet_names}
+
+def _get_cached_sheets(sheet_names):
+    """DataFrame dei fogli richiesti: quelli mancanti (o troppo vecchi) si ricaricano
+    subito, quelli solo scaduti si aggiornano in background"""
+    with SHEET_CACHE_LOCK:
+        errors = {name: REFRESH_ERRORS.pop(name) for name in sheet_names if name in REFRESH_ERRORS}
+    for name, error in errors.items():
+        st.warning(f"⚠️ Aggiornamento in background di {name} non riuscito, dati in cache: {error}")
+    now = time.time()
+    blocking = []
+    stale = []
+    for name in sheet_names:
+        policy = SHEET_CACHE_POLICY.get(name, DEFAULT_CACHE_POLICY)
+        entry = SHEET_CACHE.get(name)
+        age = now - entry["loaded_at"] if entry is not None else None
+        if entry is None or age > policy["max_stale"] or (SHEET_CACHE_MODE != "swr" and age > policy["refresh"]):
+            blocking.append(name)
+        elif age > policy["refresh"]:
+            stale.append(name)
+
+    if blocking:
+        _reload_sheets(tuple(blocking))
+
+    if stale:
+        with SHEET_CACHE_LOCK:
+            stale = tuple(name for name in stale if name not in REFRESHING_SHEETS)
+            REFRESHING_SHEETS.update(stale)
+        if stale:
+            threading.Thread(target=_refresh_sheets_in_background, args=(stale,), daemon=True).start()
+
+    return {name: SHEET_CACHE[name]["df"] for name in sheet_names}
+
+def drop_cached_sheet(sheet_name):
+    """Toglie il foglio da cache e snapshot: il prossimo accesso lo rilegge dal backend"""
+    with SHEET_CACHE_LOCK:
+        SHEET_CACHE.pop(sheet_name, None)
+    SHEET_SNAPSHOTS.pop(sheet_name, None)
+    RUN_MEMO.pop(sheet_name, None)
+
+def update_cached_sheet(sheet_name, values, revision=None):
+    """Dopo una scrittura sostituisce in cache solo il foglio toccato, con i valori appena
+    salvati. Senza una nuova revisione (nessuna cella cambiata) si tiene quella in cache"""
+    spec = SHEET_SPECS.get(sheet_name)
+    if spec is None:
+        return
+    if revision is None:
+        current = SHEET_CACHE.get(sheet_name)
+        revision = current["revision"] if current is not None else None
+    _cache_frame(sheet_name, values_to_dataframe(values, spec["schema"]), revision)
+    RUN_MEMO.pop(sheet_name, None)
+
+def load_section_sheet(section, sheet_name):
+    """Un foglio della sezione; al primo accesso arrivano in cache tutti i fogli della sezione"""
+    return get_cached_sheets(SECTION_SHEETS[section])[sheet_name]
+
 def load_projects_data():
-    df = load_from_gsheet("Projects", PROJECT_COLUMNS, date_cols=["Release Date", "Due Date", "Last Update"])
-    df["Owner"] = df["Owner"].fillna("")
-    df["GR/Mail Object"] = df["GR/Mail Object"].fillna("")
-    df["Notes"] = df["Notes"].fillna("")
-    return df
+    return load_section_sheet("Projects", "Projects")
 
-@st.cache_data(ttl=30)
 def load_eom_data():
-    eom_df = load_from_gsheet("EOM", EOM_BASE_COLUMNS)
-    if "Last Update" not in eom_df.columns:
-        eom_df["Last Update"] = pd.Timestamp.now()
-    if "Order" not in eom_df.columns:
-        eom_df["Order"] = range(len(eom_df))
-    return eom_df
-
-@st.cache_data(ttl=30)
-def load_eom_descriptions():
-    try:
-        create_sheet_if_not_exists(EOM_DESCRIPTIONS_SHEET, EOM_DESCRIPTIONS_COLUMNS)
-        desc_df = load_from_gsheet(EOM_DESCRIPTIONS_SHEET, EOM_DESCRIPTIONS_COLUMNS, date_cols=["Last Update"])
-        return desc_df
-    except:
-        return pd.DataFrame(columns=EOM_DESCRIPTIONS_COLUMNS)
-
-# ✅ NEW: LOAD ADHOC DATA (UPDATED)
-@st.cache_data(ttl=30)
-def load_adhoc_data():
-    try:
-        create_sheet_if_not_exists(ADHOC_SHEET_NAME, ADHOC_COLUMNS)
-    except:
-        pass
-
-    df = load_from_gsheet(
-        ADHOC_SHEET_NAME,
-        ADHOC_COLUMNS,
-        date_cols=["Last Done", "Last Update"]
-    )
+    return load_section_sheet("EOM", "EOM")
 
-    if "Order" not in df.columns:
-        df["Order"] = range(len(df))
-    if "Last Update" not in df.columns:
-        df["Last Update"] = pd.Timestamp.now()
-    if "Status" not in df.columns:
-        df["Status"] = EOM_WHITE
-    if "🗑️ Delete" not in df.columns:
-        df["🗑️ Delete"] = False
+def load_eom_statuses():
+    return load_section_sheet("EOM", EOM_STATUS_SHEET)
 
-    df["Status"] = df["Status"].fillna(EOM_WHITE).replace("", EOM_WHITE)
-    df["Status"] = df["Status"].apply(lambda x: x if str(x).strip() in EOM_STATUS_OPTIONS else EOM_WHITE)
+def load_eom_archive():
+    """Fuori da SECTION_SHEETS: si scarica solo quando qualcuno apre i mesi vecchi"""
+    return get_cached_sheets((EOM_ARCHIVE_SHEET,))[EOM_ARCHIVE_SHEET]
 
-    for c in ["Area", "ID Macro", "ID Micro", "Activity", "Notes"]:
-        if c in df.columns:
-            df[c] = df[c].fillna("").astype(str)
+def load_eom_descriptions():
+    return load_section_sheet("EOM", EOM_DESCRIPTIONS_SHEET)
 
-    df["🗑️ Delete"] = df["🗑️ Delete"].apply(lambda x: True if str(x).lower() in ['true', '1', 'yes'] else False)
-    df["Order"] = pd.to_numeric(df["Order"], errors="coerce").fillna(0).astype(int)
-    return df
+def load_adhoc_data():
+    return load_section_sheet("AdHoc", ADHOC_SHEET_NAME)
 
-@st.cache_data(ttl=30)
 def load_adhoc_descriptions():
-    try:
-        create_sheet_if_not_exists(ADHOC_DESCRIPTIONS_SHEET, ADHOC_DESCRIPTIONS_COLUMNS)
-        return load_from_gsheet(ADHOC_DESCRIPTIONS_SHEET, ADHOC_DESCRIPTIONS_COLUMNS, date_cols=["Last Update"])
-    except:
-        return pd.DataFrame(columns=ADHOC_DESCRIPTIONS_COLUMNS)
+    return load_section_sheet("AdHoc", ADHOC_DESCRIPTIONS_SHEET)
 
 # =========================
 # SESSION STATE
@@ -328,6 +1276,8 @@ if "confirm_delete_project" not in st.session_state:
     st.session_state.confirm_delete_project = None
 if "confirm_delete_task" not in st.session_state:
     st.session_state.confirm_delete_task = None
+if "open_project" not in st.session_state:
+    st.session_state.open_project = None
 if "show_completed_months" not in st.session_state:
     st.session_state.show_completed_months = False
 if "eom_edit_mode" not in st.session_state:
@@ -348,8 +1298,10 @@ if "hidden_months" not in st.session_state:
     st.session_state.hidden_months = []
 if "show_month_manager" not in st.session_state:
     st.session_state.show_month_manager = False
-if "eom_last_saved_state" not in st.session_state:
-    st.session_state.eom_last_saved_state = None
+if "editor_versions" not in st.session_state:
+    st.session_state.editor_versions = {}
+if "editor_digests" not in st.session_state:
+    st.session_state.editor_digests = {}
 if "show_old_months" not in st.session_state:
     st.session_state.show_old_months = False
 if "selected_old_months" not in st.session_state:
@@ -374,8 +1326,127 @@ if "adhoc_description_edit_mode" not in st.session_state:
 # =========================
 # HELPERS
 # =========================
-progress_values = ["Not started", "In progress", "Completed"]
-progress_score = {"Not started": 0, "In progress": 0.5, "Completed": 1}
+def new_row_key():
+    return uuid.uuid4().hex[:12]
+
+def missing_row_keys(df, key_col):
+    """Maschera delle righe senza chiave (o con chiave duplicata)"""
+    keys = df[key_col].astype(str).str.strip()
+    return (keys == "") | keys.duplicated()
+
+def derived_row_keys(df, key_col):
+    """Chiavi ricavate dal contenuto della riga (chiave esclusa) e dalla sua posizione:
+    finché il salvataggio non riesce ogni run ricalcola le stesse chiavi, quindi anche le
+    chiavi dei widget che le usano restano stabili"""
+    content = row_hashes(df.drop(columns=[key_col]))
+    mixed = pd.util.hash_pandas_object(
+        pd.DataFrame({"row": content.to_numpy(), "position": np.arange(len(df), dtype="uint64")}),
+        index=False
+    )
+    return [f"{h:016x}"[:12] for h in mixed.to_numpy()]
+
+def assign_row_keys(df, key_col):
+    """Assegna una chiave alle righe senza chiave (o con chiave duplicata) e reindicizza;
+    restituisce (df, True se qualche chiave è stata assegnata)"""
+    keys = df[key_col].astype(str).str.strip()
+    missing = missing_row_keys(df, key_col)
+    if not missing.any():
+        return df, False
+
+    df = df.copy()
+    df[key_col] = keys.where(~missing, derived_row_keys(df, key_col))
+    df.index = pd.Index(df[key_col].to_numpy(dtype=object))
+    return df, True
+
+def ensure_row_keys(df, sheet_name):
+    """assign_row_keys + salvataggio del foglio se qualche chiave è nuova"""
+    df, assigned = assign_row_keys(df, schema_key_column(SHEET_SPECS[sheet_name]["schema"]))
+    if assigned:
+        save_to_gsheet(df, sheet_name)
+    return df
+
+def update_row(df, key, values):
+    """Aggiorna la riga con quella chiave; False se nel frattempo è stata cancellata"""
+    if key not in df.index:
+        return False
+    for col, value in values.items():
+        df.at[key, col] = value
+    return True
+
+def editor_key(name):
+    """Chiave widget del data_editor `name`: cambia a ogni reset_editor, così il delta riparte da zero"""
+    return f"{name}_{st.session_state.editor_versions.get(name, 0)}"
+
+def reset_editor(name):
+    st.session_state.editor_versions[name] = st.session_state.editor_versions.get(name, 0) + 1
+
+def sync_editor(name, view_df):
+    """Da chiamare prima del data_editor. Se i dati mostrati sono cambiati (digest diverso,
+    es. modifiche di un altro utente) e non ci sono modifiche in sospeso l'editor riparte.
+    Con modifiche in sospeso l'editor resta com'è: le posizioni del delta continuano a
+    riferirsi alle righe di partenza (vedi editor_changes) e l'utente viene avvisato.
+    In sessione restano digest e chiavi delle righe, non una copia della tabella."""
+    digest = table_digest(view_df)
+    base = st.session_state.editor_digests.get(name)
+    if base is not None and base["digest"] != digest:
+        if editor_edited_rows(name):
+            st.warning("⚠️ I dati sono cambiati mentre li modificavi: le modifiche non salvate restano sulle righe di partenza, controllale prima di salvare")
+            return
+        reset_editor(name)
+    st.session_state.editor_digests[name] = {"digest": digest, "keys": list(view_df.index)}
+
+def editor_edited_rows(name):
+    """Delta edited_rows ({posizione: {colonna: valore}}) del data_editor `name`"""
+    state = st.session_state.get(editor_key(name)) or {}
+    return state.get("edited_rows", {})
+
+def editor_cell_value(series, value):
+    """Converte un valore di edited_rows (JSON dal frontend) nel tipo della colonna"""
+    if series.dtype == STATUS_DTYPE:
+        return clean_status_series(pd.Series([value])).iloc[0]
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.to_datetime(value, errors="coerce")
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_numeric(value, errors="coerce")
+    return "" if value is None else value
+
+def editor_changes(name, view_df):
+    """[(chiave riga, colonna, valore)] modificati nel data_editor `name`: legge solo il delta
+    edited_rows di st.session_state e scarta i valori già uguali a quelli di view_df (il
+    frame passato all'editor, indicizzato per chiave). Le posizioni si traducono in chiavi
+    con le righe registrate da sync_editor; le righe nel frattempo sparite si scartano."""
+    base = st.session_state.editor_digests.get(name)
+    keys = base["keys"] if base is not None else list(view_df.index)
+    changes = []
+    for pos, cells in editor_edited_rows(name).items():
+        pos = int(pos)
+        if pos >= len(keys) or keys[pos] not in view_df.index:
+            continue
+        row = view_df.loc[keys[pos]]
+        for col, value in cells.items():
+            if col not in view_df.columns:
+                continue
+            value = editor_cell_value(view_df[col], value)
+            current = row[col]
+            if (pd.isna(current) and pd.isna(value)) or str(current) == str(value):
+                continue
+            changes.append((keys[pos], col, value))
+    return changes
+
+def apply_cell_changes(df, changes):
+    """Applica a df i (chiave, colonna, valore) delle righe ancora presenti; restituisce le chiavi toccate"""
+    keys = []
+    for key, col, value in changes:
+        if key in df.index and col in df.columns:
+            df.at[key, col] = value
+            keys.append(key)
+    return list(dict.fromkeys(keys))
+
+def fill_last_done(df, keys):
+    """Attività AdHoc passate a 🟢 senza Last Done: Last Done = adesso"""
+    rows = df.loc[keys]
+    missing = rows.index[(rows["Status"] == EOM_GREEN) & rows["Last Done"].isna()]
+    df.loc[missing, "Last Done"] = pd.Timestamp.now()
 
 def parse_id(id_str):
     """Estrae macro e micro ID da una stringa come '1.2' o '1'"""
@@ -398,39 +1469,65 @@ def parse_id(id_str):
         except:
             return None, None
 
+# stessa semantica di parse_id: "7" -> (7, -), "7.2" -> (7, 2), "7.2.x" -> (7, 2), "7." o "x" -> (-, -)
+ID_PATTERN = r"^\s*([+-]?\d+)\s*(?:\.\s*([+-]?\d+)\s*(?:\..*)?)?$"
+
+def parse_ids(series):
+    """Versione vettoriale di parse_id su tutta la colonna: DataFrame con "macro" e "micro"
+    (float, NaN dove parse_id restituisce None)"""
+    parts = series.fillna("").astype(str).str.extract(ID_PATTERN)
+    return pd.DataFrame({
+        "macro": pd.to_numeric(parts[0], errors="coerce"),
+        "micro": pd.to_numeric(parts[1], errors="coerce"),
+    }, index=series.index)
+
 def sort_by_ids(df, macro_col="ID Macro", micro_col="ID Micro", order_col="Order"):
-    """Ordina per ID Macro poi ID Micro (macro prima delle micro), stabile con Order"""
+    """Ordina per ID Macro poi ID Micro (macro prima delle micro), stabile con Order;
+    l'indice (la chiave della riga) resta quello di partenza"""
     if df is None or len(df) == 0:
         return df
     d = df.copy()
 
-    def _macro_key(x):
-        try:
-            m, _ = parse_id(x)
-            return m if m is not None else 10**9
-        except:
-            return 10**9
-
-    def _micro_key(x):
-        try:
-            _, micro = parse_id(x)
-            return micro if micro is not None else 0
-        except:
-            return 0
-
-    d["_macro_sort"] = d[macro_col].apply(_macro_key) if macro_col in d.columns else 10**9
-    d["_micro_sort"] = d[micro_col].apply(_micro_key) if micro_col in d.columns else 0
+    d["_macro_sort"] = parse_ids(d[macro_col])["macro"].fillna(10**9) if macro_col in d.columns else 10**9
+    d["_micro_sort"] = parse_ids(d[micro_col])["micro"].fillna(0) if micro_col in d.columns else 0
     if order_col not in d.columns:
         d[order_col] = range(len(d))
 
-    d = d.sort_values(by=["_macro_sort", "_micro_sort", order_col], ascending=[True, True, True]).reset_index(drop=True)
+    d = d.sort_values(by=["_macro_sort", "_micro_sort", order_col], ascending=[True, True, True])
     d = d.drop(columns=["_macro_sort", "_micro_sort"], errors="ignore")
     return d
 
-def renumber_ids(df, macro_col="ID Macro", micro_col="ID Micro"):
-    """Rinumera automaticamente gli ID Macro e Micro di un DataFrame (stile EOM)"""
+def _renumbered_ids(df, macro_col, micro_col):
+    """Nuovi ID Macro e Micro (macro in rango denso, micro progressivi dentro ogni macro),
+    allineati alle righe di df"""
+    d = pd.DataFrame({
+        "macro": df[macro_col].to_numpy(dtype=object),
+        "micro": df[micro_col].to_numpy(dtype=object),
+        "parsed_macro": parse_ids(df[macro_col])["macro"].to_numpy(),
+        "parsed_micro": parse_ids(df[micro_col])["micro"].to_numpy(),
+    })
+    d = d.sort_values(["parsed_macro", "parsed_micro"], na_position="last")
+
+    # macro: rango denso dei macro originali (1, 2, 3...), le righe senza macro valido restano come sono
+    has_macro = d["parsed_macro"].notna()
+    d.loc[has_macro, "macro"] = d.loc[has_macro, "parsed_macro"].rank(method="dense").astype(int).astype(str)
+
+    # micro: contatore progressivo dentro ogni macro, solo per le righe che avevano un micro
+    has_micro = d["parsed_micro"].notna() & d["macro"].notna() & (d["macro"].astype(str) != "")
+    micro_counter = d[has_micro].groupby("macro", sort=False).cumcount() + 1
+    d.loc[has_micro, "micro"] = d.loc[has_micro, "macro"].astype(str) + "." + micro_counter.astype(str)
+
+    d = d.sort_index()
+    return d["macro"].set_axis(df.index), d["micro"].set_axis(df.index)
+
+def renumber_ids_incremental(df, affected_macros=None, macro_col="ID Macro", micro_col="ID Micro"):
+    """Rinumera gli ID Macro e Micro senza riordinare le righe; restituisce (df, righe cambiate).
+
+    Se i macro sono già 1..N (nessun macro creato o rimosso) si toccano solo i gruppi dei
+    macro in affected_macros; altrimenti si rinumera tutto, spostando i macro successivi.
+    Con le scritture delta vengono riscritte solo le righe cambiate."""
     if df is None or len(df) == 0:
-        return df
+        return df, pd.Series(False, index=df.index if df is not None else None)
 
     d = df.copy()
     if macro_col not in d.columns:
@@ -438,92 +1535,122 @@ def renumber_ids(df, macro_col="ID Macro", micro_col="ID Micro"):
     if micro_col not in d.columns:
         d[micro_col] = ""
 
-    d["parsed_macro"] = d[macro_col].apply(lambda x: parse_id(x)[0])
-    d["parsed_micro"] = d[micro_col].apply(lambda x: parse_id(x)[1])
-
-    d = d.sort_values(["parsed_macro", "parsed_micro"], na_position="last").reset_index(drop=True)
-
-    new_macro_counter = 1
-    macro_mapping = {}
-
-    for idx, row in d.iterrows():
-        old_macro = row["parsed_macro"]
-        if pd.isna(old_macro):
-            continue
-        if old_macro not in macro_mapping:
-            macro_mapping[old_macro] = new_macro_counter
-            new_macro_counter += 1
-        d.loc[idx, macro_col] = str(macro_mapping[old_macro])
+    parsed_macro = parse_ids(d[macro_col])["macro"]
+    present = sorted(parsed_macro.dropna().unique())
+    scope = pd.Series(True, index=d.index)
+    if affected_macros is not None and present == list(range(1, len(present) + 1)):
+        affected = parse_ids(pd.Series(list(affected_macros), dtype=object))["macro"].dropna()
+        scope = parsed_macro.isin(affected)
+
+    new_macro, new_micro = _renumbered_ids(d, macro_col, micro_col)
+    changed = scope & (
+        (d[macro_col].astype(str) != new_macro.astype(str)) |
+        (d[micro_col].astype(str) != new_micro.astype(str))
+    )
+    d.loc[changed, macro_col] = new_macro[changed]
+    d.loc[changed, micro_col] = new_micro[changed]
+    return d, changed
+
+def row_hashes(df):
+    """Hash stabile (uint64) di ogni riga sui valori normalizzati a testo (NaN/NaT/None = ""),
+    così categorical e object con gli stessi valori coincidono"""
+    norm = df.astype(object).where(df.notna(), "").astype(str)
+    return pd.util.hash_pandas_object(norm, index=False)
+
+def table_digest(df):
+    """Digest dell'intera tabella (colonne, chiavi di riga e hash delle righe)"""
+    h = hashlib.sha1(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(pd.util.hash_pandas_object(pd.Series(df.index.astype(str)), index=False).to_numpy().tobytes())
+    h.update(row_hashes(df).to_numpy().tobytes())
+    return h.hexdigest()
+
+def stamp_rows(df, rows, column="Last Update"):
+    """Aggiorna `column` all'ora corrente sulle righe della maschera `rows`: le righe
+    modificate dal salvataggio più quelle rinumerate da renumber_ids_incremental"""
+    df.loc[rows, column] = pd.Timestamp.now()
+    return df
 
-    for macro_id in d[macro_col].unique():
-        if not macro_id or pd.isna(macro_id):
-            continue
-        mask = d[macro_col] == macro_id
-        micro_rows = d[mask & d["parsed_micro"].notna()]
-        if len(micro_rows) > 0:
-            new_micro_counter = 1
-            for idx in micro_rows.index:
-                d.loc[idx, micro_col] = f"{macro_id}.{new_micro_counter}"
-                new_micro_counter += 1
-
-    d = d.drop(["parsed_macro", "parsed_micro"], axis=1, errors="ignore")
-    return d
+def project_summary(df):
+    """Riepilogo dei progetti con un solo groupby: una riga per progetto con Area (della
+    prima task), Completion (0-1), Tasks, Completed, Next Due e Overdue (task aperte).
+    Restituisce anche {progetto: posizioni delle sue righe in df} per il rendering."""
+    today = pd.Timestamp(date.today())
+    open_task = df["Progress"] != "Completed"
+    work = pd.DataFrame({
+        "Area": df["Area"],
+        "Score": df["Progress"].map(progress_score).astype(float),
+        "Done": ~open_task,
+        "Due": df["Due Date"].where(open_task),
+        "Overdue": open_task & (df["Due Date"] < today),
+    }, index=df.index)
+    grouped = work.groupby(df["Project"].to_numpy(), sort=False)
+    summary = grouped.agg(**{
+        "Area": ("Area", "first"),
+        "Completion": ("Score", "mean"),
+        "Tasks": ("Score", "size"),
+        "Completed": ("Done", "sum"),
+        "Next Due": ("Due", "min"),
+        "Overdue": ("Overdue", "sum"),
+    })
+    return summary, grouped.indices
+
+def cached_project_summary(df, sheet_name="Projects"):
+    """project_summary tenuto nella voce di SHEET_CACHE del foglio: df ne è una selezione di
+    righe, quindi con lo stesso indice (e lo stesso giorno, per gli Overdue) il riepilogo
+    è ancora valido. Una nuova versione del foglio crea una nuova voce e lo ricalcola."""
+    entry = SHEET_CACHE.get(sheet_name)
+    today = date.today()
+    memo = entry.get("summary") if entry is not None else None
+    if memo is not None and memo[0] == today and memo[1].equals(df.index):
+        return memo[2]
+    result = project_summary(df)
+    if entry is not None:
+        entry["summary"] = (today, df.index, result)
+    return result
+
+def projects_by_area(summary):
+    """{area: [progetti ordinati]} per le righe di summary"""
+    return {area: sorted(group.index) for area, group in summary.groupby("Area", sort=True)}
+
+def project_header(project, info):
+    header = f"📁 {project} — {int(info['Completion'] * 100)}%"
+    if info["Overdue"] > 0:
+        header += f" · ⚠️ {int(info['Overdue'])} overdue"
+    return header
+
+def project_toggle(project, header_text, key_prefix):
+    """Intestazione cliccabile al posto di st.expander: il corpo del progetto (con tutti i
+    suoi widget) si costruisce solo per il progetto aperto, in st.session_state.open_project"""
+    is_open = st.session_state.open_project == project
+    if st.button(f"{'▾' if is_open else '▸'} {header_text}", key=f"{key_prefix}_{project}", use_container_width=True):
+        st.session_state.open_project = None if is_open else project
+        st.rerun()
+    return is_open
+
+def paginate(items, key):
+    """Oltre PROJECTS_PAGE_SIZE elementi mostra un selettore di pagina e restituisce solo quella"""
+    if len(items) <= PROJECTS_PAGE_SIZE:
+        return items
+    pages = (len(items) - 1) // PROJECTS_PAGE_SIZE + 1
+    page = st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, value=1, step=1, key=key)
+    start = (int(page) - 1) * PROJECTS_PAGE_SIZE
+    end = min(start + PROJECTS_PAGE_SIZE, len(items))
+    st.caption(f"Showing projects {start + 1}-{end} of {len(items)}")
+    return items[start:end]
 
 # ✅ EOM sort by Macro ID then Micro ID (e.g., 7, 7.1, 7.2...)
 def sort_eom_by_ids(df):
     return sort_by_ids(df, "ID Macro", "ID Micro", "Order")
 
-def renumber_eom_ids(df):
-    return renumber_ids(df, "ID Macro", "ID Micro")
-
-def clean_eom_dataframe(df, month_cols):
-    """Pulisce il DataFrame EOM assicurando i tipi corretti"""
-    df = df.copy()
-
-    for col in month_cols:
-        if col in df.columns:
-            df[col] = df[col].fillna(EOM_WHITE)
-            df[col] = df[col].replace("", EOM_WHITE)
-
-            def _norm_status(x):
-                s = str(x).strip()
-                if s in EOM_STATUS_OPTIONS:
-                    return s
-                if s in ["True", "true", "Done", "1"]:
-                    return EOM_GREEN
-                if s in ["False", "false", "Undone", "0"]:
-                    return EOM_RED
-                if s.lower() in ["na", "n/a", "not applicable", "not to do", "skip", "skipped", "excluded", "no"]:
-                    return EOM_GRAY
-                return EOM_WHITE
-
-            df[col] = df[col].apply(_norm_status)
-
-    if "🗑️ Delete" in df.columns:
-        df["🗑️ Delete"] = df["🗑️ Delete"].apply(
-            lambda x: True if str(x).lower() in ['true', '1', 'yes'] else False
-        )
-
-    text_cols = ["Area", "ID Macro", "ID Micro", "Activity", "Frequency", "Files"]
-    for col in text_cols:
-        if col in df.columns:
-            df[col] = df[col].fillna("").astype(str)
-
-    return df
-
 def clean_status_series(series: pd.Series) -> pd.Series:
-    def _norm(x):
-        s = str(x).strip()
-        if s in EOM_STATUS_OPTIONS:
-            return s
-        if s in ["True", "true", "Done", "1"]:
-            return EOM_GREEN
-        if s in ["False", "false", "Undone", "0"]:
-            return EOM_RED
-        if s.lower() in ["na", "n/a", "not applicable", "not to do", "skip", "skipped", "excluded", "no"]:
-            return EOM_GRAY
-        return EOM_WHITE
-    return series.fillna(EOM_WHITE).replace("", EOM_WHITE).apply(_norm)
+    """Normalizza una colonna di stati con due dizionari di lookup (valore esatto, poi
+    minuscolo) invece di una funzione per cella; restituisce STATUS_DTYPE"""
+    raw = series.astype(object).where(series.notna(), EOM_WHITE).astype(str).str.strip()
+    status = raw.map(STATUS_EXACT)
+    unmatched = status.isna()
+    if unmatched.any():
+        status[unmatched] = raw[unmatched].str.lower().map(STATUS_LOWER)
+    return status.fillna(EOM_WHITE).astype(STATUS_DTYPE)
 
 def last_working_day(year, month):
     """Calcola l'ultimo giorno lavorativo del mese"""
@@ -587,6 +1714,191 @@ def get_visible_months():
 
     return visible_months
 
+# =========================
+# ✅ STATI EOM IN FORMATO LUNGO
+# =========================
+def eom_month_key(year, month):
+    """Chiave del mese nel foglio degli stati (es. 2024-03)"""
+    return f"{year:04d}-{month:02d}"
+
+def eom_month_label(year, month):
+    """Intestazione della colonna del mese: ultimo giorno lavorativo (es. 29 March 2024)"""
+    return last_working_day(year, month).strftime("%d %B %Y")
+
+def legacy_eom_month_columns(df):
+    """{colonna: chiave mese} per le vecchie colonne-mese del foglio EOM"""
+    months = {}
+    for col in df.columns:
+        if col in EOM_BASE_SCHEMA:
+            continue
+        try:
+            d = datetime.strptime(str(col), "%d %B %Y")
+        except ValueError:
+            continue
+        months[col] = eom_month_key(d.year, d.month)
+    return months
+
+@st.cache_resource
+def get_eom_maintenance_lock():
+    """Lock di processo per migrazione e archiviazione degli stati EOM: una sessione
+    alla volta, le altre poi trovano il lavoro già fatto"""
+    return threading.Lock()
+
+EOM_MAINTENANCE_LOCK = get_eom_maintenance_lock()
+
+def eom_layout_outdated(eom_df):
+    return bool(legacy_eom_month_columns(eom_df)) or bool(missing_row_keys(eom_df, "Key").any())
+
+def migrate_eom_layout(eom_df, status_df):
+    """Assegna una Key alle attività che non ce l'hanno e sposta gli stati delle vecchie
+    colonne-mese del foglio EOM in EOM_STATUS_SHEET (succede una volta sola).
+
+    Gira sotto EOM_MAINTENANCE_LOCK e ricontrolla sui fogli riletti (se la rilettura
+    fallisce non fa nulla, non migra mai a partire da fogli vuoti). Le Key si salvano
+    in EOM prima degli stati (con le vecchie colonne ancora presenti), così se il
+    salvataggio degli stati fallisce la migrazione riparte dalle stesse Key."""
+    if not eom_layout_outdated(eom_df):
+        return eom_df, status_df
+
+    with EOM_MAINTENANCE_LOCK:
+        try:
+            fresh_eom = read_sheet("EOM")
+            fresh_status = read_sheet(EOM_STATUS_SHEET)
+        except Exception:
+            # senza una lettura sicura non si migra: si riprova al prossimo run
+            return eom_df, status_df
+        if not eom_layout_outdated(fresh_eom):
+            return fresh_eom, fresh_status
+        return _migrate_eom_layout(fresh_eom, fresh_status)
+
+def _migrate_eom_layout(eom_df, status_df):
+    legacy = legacy_eom_month_columns(eom_df)
+    eom_df, keys_assigned = assign_row_keys(eom_df, "Key")
+    if keys_assigned and not save_to_gsheet(eom_df, "EOM"):
+        return eom_df, status_df
+
+    if legacy:
+        long_df = eom_df[["Key"] + list(legacy)].melt(id_vars="Key", var_name="Month", value_name="Status")
+        long_df["Month"] = long_df["Month"].map(legacy)
+        long_df["Status"] = clean_status_series(long_df["Status"])
+        long_df = long_df[long_df["Status"] != EOM_WHITE]
+        # se lo stesso mese è già nel foglio degli stati vale quello
+        known = pd.MultiIndex.from_frame(status_df[["Key", "Month"]])
+        long_df = long_df[~pd.MultiIndex.from_frame(long_df[["Key", "Month"]]).isin(known)]
+        long_df = long_df.assign(**{"Updated At": pd.Timestamp.now()})
+        new_status_df = pd.concat([status_df, long_df[EOM_STATUS_COLUMNS]], ignore_index=True)
+        if not save_to_gsheet(new_status_df, EOM_STATUS_SHEET):
+            return eom_df.drop(columns=list(legacy)), status_df
+        status_df = new_status_df
+        eom_df = eom_df.drop(columns=list(legacy))
+        save_to_gsheet(eom_df, "EOM")
+
+    return eom_df, status_df
+
+def eom_archive_cutoff():
+    """Chiave del primo mese visibile: gli stati dei mesi precedenti vanno in archivio"""
+    return eom_month_key(*get_visible_months()[0])
+
+def eom_status_sheet_for(month):
+    return EOM_ARCHIVE_SHEET if str(month) < eom_archive_cutoff() else EOM_STATUS_SHEET
+
+def rollover_eom_statuses(status_df):
+    """Sposta in EOM_ARCHIVE_SHEET gli stati dei mesi usciti dalla finestra visibile
+    (succede al cambio mese); restituisce gli stati rimasti nel foglio caldo.
+
+    Gira sotto EOM_MAINTENANCE_LOCK; a lavoro finito il marcatore EOM_ROLLOVER_MARKER
+    in META_SHEET registra il mese di taglio, così le altre sessioni (e gli altri
+    processi) non rifanno l'archiviazione partendo da una cache vecchia. Parte solo da
+    fogli riletti con successo: se una lettura fallisce si salta e si riprova al
+    prossimo run, mai un archivio salvato sopra un foglio vuoto."""
+    cutoff = eom_archive_cutoff()
+    closed = status_df["Month"].astype(str) < cutoff
+    if not closed.any():
+        return status_df
+    if (fetch_sheet_revisions() or {}).get(EOM_ROLLOVER_MARKER) == cutoff:
+        return status_df[~closed].reset_index(drop=True)
+
+    with EOM_MAINTENANCE_LOCK:
+        if (fetch_sheet_revisions() or {}).get(EOM_ROLLOVER_MARKER) == cutoff:
+            return status_df[~closed].reset_index(drop=True)
+        try:
+            fresh_status = read_sheet(EOM_STATUS_SHEET)
+            archive = read_sheet(EOM_ARCHIVE_SHEET)
+        except Exception:
+            return status_df
+        remaining = _rollover_eom_statuses(fresh_status, archive, cutoff)
+        if remaining is not fresh_status:
+            try:
+                STORAGE.write_marker(EOM_ROLLOVER_MARKER, cutoff)
+            except Exception:
+                pass  # senza marcatore si rifà al prossimo run: l'archiviazione è idempotente
+        return remaining
+
+def _rollover_eom_statuses(status_df, archive, cutoff):
+    closed = status_df["Month"].astype(str) < cutoff
+    if not closed.any():
+        return status_df.reset_index(drop=True)
+
+    moved = status_df[closed]
+    # a parità di (Key, mese) vale lo stato più recente, cioè quello del foglio caldo
+    stale = pd.MultiIndex.from_frame(archive[["Key", "Month"]]).isin(pd.MultiIndex.from_frame(moved[["Key", "Month"]]))
+    archive = pd.concat([archive[~stale], moved], ignore_index=True)
+    if not save_to_gsheet(archive, EOM_ARCHIVE_SHEET):
+        return status_df
+
+    remaining = status_df[~closed].reset_index(drop=True)
+    if not save_to_gsheet(remaining, EOM_STATUS_SHEET):
+        return status_df
+    return remaining
+
+def pivot_eom_statuses(eom_df, status_df, month_cols):
+    """Aggiunge a eom_df una colonna di stato per ogni mese richiesto ({intestazione: chiave mese});
+    i mesi senza stato registrato valgono EOM_WHITE"""
+    df = eom_df.copy()
+    wanted = status_df[status_df["Month"].isin(list(month_cols.values()))]
+    wide = wanted.drop_duplicates(["Key", "Month"], keep="last").pivot(index="Key", columns="Month", values="Status")
+    for col, key in month_cols.items():
+        if key in wide.columns:
+            df[col] = df["Key"].map(wide[key]).astype(STATUS_DTYPE).fillna(EOM_WHITE)
+        else:
+            df[col] = pd.Series(EOM_WHITE, index=df.index, dtype=STATUS_DTYPE)
+    return df
+
+def eom_status_changes(changes, month_cols):
+    """[(Key, chiave mese, stato)] dai cambi di cella del data_editor sulle colonne mese
+    ({intestazione: chiave mese} in month_cols)"""
+    return [(key, month_cols[col], value) for key, col, value in changes if col in month_cols]
+
+def upsert_eom_statuses(changes):
+    """Aggiorna la riga (Key, mese) di ogni stato cambiato, o la aggiunge in coda:
+    con le scritture delta ogni cambio di stato tocca una sola riga del foglio.
+    I mesi chiusi finiscono nell'archivio."""
+    by_sheet = {}
+    for change in changes:
+        by_sheet.setdefault(eom_status_sheet_for(change[1]), []).append(change)
+    return all([_upsert_eom_statuses(sheet_name, sheet_changes) for sheet_name, sheet_changes in by_sheet.items()])
+
+def _upsert_eom_statuses(sheet_name, changes):
+    # rilettura fresca: il foglio intero viene salvato, quindi partire dalla cache
+    # cancellerebbe le righe scritte nel frattempo da altre sessioni o processi
+    fresh = load_from_gsheet(sheet_name, required=True)
+    if fresh is None:
+        return False
+    fresh = fresh.reset_index(drop=True)
+    rows = {(k, m): i for i, (k, m) in enumerate(zip(fresh["Key"], fresh["Month"]))}
+    now = pd.Timestamp.now()
+    new_rows = []
+    for key, month, status in changes:
+        i = rows.get((key, month))
+        if i is not None:
+            fresh.loc[i, "Status"] = status
+            fresh.loc[i, "Updated At"] = now
+        elif status != EOM_WHITE:
+            new_rows.append({"Key": key, "Month": month, "Status": status, "Updated At": now})
+    if new_rows:
+        fresh = pd.concat([fresh, pd.DataFrame(new_rows, columns=EOM_STATUS_COLUMNS)], ignore_index=True)
+    return save_to_gsheet(fresh, sheet_name)
+
 def get_activity_description(activity_name, descriptions_df):
     if len(descriptions_df) == 0:
         return ""
@@ -610,19 +1922,9 @@ def save_activity_description(activity_name, description, descriptions_df, sheet
         descriptions_df = pd.concat([descriptions_df, new_row], ignore_index=True)
 
     if save_to_gsheet(descriptions_df, sheet_name):
-        st.cache_data.clear()
         return True
     return False
 
-# =========================
-# CARICA DATI (CON CACHE)
-# =========================
-df = load_projects_data()
-eom_df = load_eom_data()
-eom_descriptions_df = load_eom_descriptions()
-adhoc_df = load_adhoc_data()
-adhoc_descriptions_df = load_adhoc_descriptions()
-
 # =========================
 # HEADER + NAVIGATION
 # =========================
@@ -654,6 +1956,8 @@ st.divider()
 # ======================================================
 if st.session_state.section == "Projects":
 
+    df = ensure_row_keys(load_projects_data(), "Projects")
+
     col_title, col_actions = st.columns([6, 4])
     with col_title:
         st.subheader("📊 Projects Activities")
@@ -666,6 +1970,7 @@ if st.session_state.section == "Projects":
                 st.caption(f"🕒 Last update: {last_update.strftime('%d/%m/%Y %H:%M')}")
             except:
                 st.caption(f"🕒 Last update: {pd.Timestamp.now().strftime('%d/%m/%Y %H:%M')}")
+        render_write_status(SECTION_SHEETS["Projects"])
 
     with col_actions:
         c1, c2, c3, c4 = st.columns(4)
@@ -709,7 +2014,7 @@ if st.session_state.section == "Projects":
                                                key=f"filter_status_{st.session_state.reset_filters_flag}")
 
             with col4:
-                priorities = ["All", "Low", "Important", "Urgent"]
+                priorities = ["All"] + priority_values
                 selected_priority = st.selectbox("Priority", priorities,
                                                  index=0,
                                                  key=f"filter_priority_{st.session_state.reset_filters_flag}")
@@ -805,7 +2110,7 @@ if st.session_state.section == "Projects":
                 with col_a:
                     p = st.selectbox("Status", progress_values, key=f"new_prog_{i}")
                 with col_b:
-                    pr = st.selectbox("Priority", ["Low", "Important", "Urgent"], key=f"new_prio_{i}")
+                    pr = st.selectbox("Priority", priority_values, key=f"new_prio_{i}")
 
                 col_c, col_d = st.columns(2)
                 with col_c:
@@ -838,7 +2143,7 @@ if st.session_state.section == "Projects":
             elif not tasks:
                 st.error("❌ Add at least one task!")
             else:
-                fresh_df = load_from_gsheet("Projects", PROJECT_COLUMNS, date_cols=["Release Date", "Due Date", "Last Update"])
+                fresh_df = load_from_gsheet("Projects")
 
                 new_rows = []
                 next_order = fresh_df["Order"].max() + 1 if len(fresh_df) > 0 else 0
@@ -855,7 +2160,8 @@ if st.session_state.section == "Projects":
                         "GR/Mail Object": gr,
                         "Notes": notes,
                         "Last Update": pd.Timestamp.now(),
-                        "Order": next_order
+                        "Order": next_order,
+                        "Task ID": new_row_key()
                     })
                     next_order += 1
 
@@ -865,7 +2171,7 @@ if st.session_state.section == "Projects":
                     st.session_state.add_project = False
                     st.session_state.task_boxes = 1
                     st.success(f"✅ Project '{project}' created successfully!")
-                    time.sleep(1)
+                    pause_before_rerun(1)
                     st.rerun()
 
         if col3.button("Cancel"):
@@ -882,14 +2188,14 @@ if st.session_state.section == "Projects":
         col1, col2 = st.columns(2)
         with col1:
             if st.button("✅ Yes, delete project", key=f"confirm_del_proj_{project}", type="primary"):
-                fresh_df = load_from_gsheet("Projects", PROJECT_COLUMNS, date_cols=["Release Date", "Due Date", "Last Update"])
+                fresh_df = load_from_gsheet("Projects")
                 fresh_df = fresh_df[fresh_df["Project"] != project].reset_index(drop=True)
 
                 if save_to_gsheet(fresh_df, "Projects"):
                     st.success(f"✅ Project '{project}' deleted")
                     st.session_state.confirm_delete_project = None
                     st.session_state.delete_mode = False
-                    time.sleep(1)
+                    pause_before_rerun(1)
                     st.rerun()
         with col2:
             if st.button("❌ Cancel", key=f"cancel_del_proj_{project}"):
@@ -902,24 +2208,25 @@ if st.session_state.section == "Projects":
     # ======================================================
     if st.session_state.confirm_delete_task is not None:
         task_id = st.session_state.confirm_delete_task
-        project_name, task_name = task_id
 
-        fresh_df = load_from_gsheet("Projects", PROJECT_COLUMNS, date_cols=["Release Date", "Due Date", "Last Update"])
-        mask = (fresh_df["Project"] == project_name) & (fresh_df["Task"] == task_name)
+        # per il messaggio basta la cache; la lettura fresca serve solo alla cancellazione
+        projects_df = load_projects_data()
 
-        if mask.any():
+        if task_id in projects_df.index:
+            task_name = projects_df.at[task_id, "Task"]
             st.warning(f"⚠️ Are you sure you want to delete the task **{task_name}**? This cannot be undone!")
             col1, col2 = st.columns(2)
             with col1:
-                if st.button("✅ Yes, delete task", key=f"confirm_del_task_{task_name}", type="primary"):
-                    fresh_df = fresh_df[~mask].reset_index(drop=True)
+                if st.button("✅ Yes, delete task", key=f"confirm_del_task_{task_id}", type="primary"):
+                    fresh_df = load_from_gsheet("Projects")
+                    fresh_df = fresh_df.drop(task_id, errors="ignore")
                     if save_to_gsheet(fresh_df, "Projects"):
                         st.success(f"✅ Task '{task_name}' deleted")
                         st.session_state.confirm_delete_task = None
-                        time.sleep(1)
+                        pause_before_rerun(1)
                         st.rerun()
             with col2:
-                if st.button("❌ Cancel", key=f"cancel_del_task_{task_name}"):
+                if st.button("❌ Cancel", key=f"cancel_del_task_{task_id}"):
                     st.session_state.confirm_delete_task = None
                     st.rerun()
             st.stop()
@@ -928,18 +2235,10 @@ if st.session_state.section == "Projects":
     # 📁 PROJECT VIEW - ORGANIZZATO PER STATUS E AREA
     # ======================================================
     if not st.session_state.add_project and len(df) > 0:
-        in_progress_projects = {}
-        completed_projects = {}
-
-        for project in df["Project"].unique():
-            proj_df = df[df["Project"] == project]
-            area = proj_df["Area"].iloc[0]
-            completion = proj_df["Progress"].map(progress_score).mean()
-
-            if completion == 1.0:
-                completed_projects.setdefault(area, []).append(project)
-            else:
-                in_progress_projects.setdefault(area, []).append(project)
+        summary, project_rows = cached_project_summary(df)
+        done = summary["Completion"] == 1.0
+        in_progress_projects = projects_by_area(summary[~done])
+        completed_projects = projects_by_area(summary[done])
 
         in_progress_areas = sorted(in_progress_projects.keys())
         completed_areas = sorted(completed_projects.keys())
@@ -950,25 +2249,31 @@ if st.session_state.section == "Projects":
             for area in in_progress_areas:
                 st.markdown(f"#### 📍 {area}")
 
-                for project in sorted(in_progress_projects[area]):
-                    proj_df = df[df["Project"] == project]
-                    completion = int(proj_df["Progress"].map(progress_score).mean() * 100)
-
-                    header_text = f"📁 {project} — {completion}%"
+                for project in paginate(in_progress_projects[area], key=f"proj_page_open_{area}"):
+                    info = summary.loc[project]
+                    header_text = project_header(project, info)
 
                     if st.session_state.delete_mode:
                         cols = st.columns([8, 1])
                         with cols[0]:
-                            expand = st.expander(header_text, expanded=False)
+                            is_open = project_toggle(project, header_text, "open_proj")
                         with cols[1]:
                             if st.button("🗑️", key=f"delete_proj_{project}"):
                                 st.session_state.confirm_delete_project = project
                                 st.rerun()
                     else:
-                        expand = st.expander(header_text, expanded=False)
+                        is_open = project_toggle(project, header_text, "open_proj")
+
+                    if not is_open:
+                        continue
 
-                    with expand:
+                    proj_df = df.iloc[project_rows[project]]
+                    completion = int(info["Completion"] * 100)
+
+                    with st.container(border=True):
                         st.progress(completion / 100)
+                        next_due = info["Next Due"].strftime('%d/%m/%Y') if pd.notna(info["Next Due"]) else '—'
+                        st.caption(f"✅ {int(info['Completed'])}/{int(info['Tasks'])} tasks completed | 📅 Next due: {next_due}")
 
                         for idx, r in proj_df.iterrows():
                             cols = st.columns([10, 1])
@@ -982,8 +2287,8 @@ if st.session_state.section == "Projects":
                                     col_a, col_b = st.columns(2)
                                     with col_a:
                                         new_priority = st.selectbox(
-                                            "Priority", ["Low", "Important", "Urgent"],
-                                            index=["Low", "Important", "Urgent"].index(r['Priority']) if r['Priority'] in ["Low", "Important", "Urgent"] else 0,
+                                            "Priority", priority_values,
+                                            index=priority_values.index(r['Priority']) if r['Priority'] in priority_values else 0,
                                             key=f"edit_priority_{idx}"
                                         )
                                     with col_b:
@@ -1019,20 +2324,26 @@ if st.session_state.section == "Projects":
                                     new_notes = st.text_area("📝 Notes", value=r.get('Notes', ''), key=f"edit_notes_{idx}", height=80)
 
                                     if st.button("💾 Save Changes", key=f"save_edit_{idx}", type="primary"):
-                                        fresh_df = load_from_gsheet("Projects", PROJECT_COLUMNS, date_cols=["Release Date", "Due Date", "Last Update"])
-                                        fresh_df.loc[idx, "Task"] = new_task
-                                        fresh_df.loc[idx, "Owner"] = new_owner
-                                        fresh_df.loc[idx, "Priority"] = new_priority
-                                        fresh_df.loc[idx, "Progress"] = new_progress
-                                        fresh_df.loc[idx, "Release Date"] = pd.Timestamp(new_release) if new_release else pd.NaT
-                                        fresh_df.loc[idx, "Due Date"] = pd.Timestamp(new_due) if new_due else pd.NaT
-                                        fresh_df.loc[idx, "GR/Mail Object"] = f"{new_gr}\n{new_mail}" if new_gr or new_mail else ""
-                                        fresh_df.loc[idx, "Notes"] = new_notes
-                                        fresh_df.loc[idx, "Last Update"] = pd.Timestamp.now()
-
-                                        if save_to_gsheet(fresh_df, "Projects"):
+                                        fresh_df = load_from_gsheet("Projects")
+                                        before = row_hashes(fresh_df.loc[[idx]]).iloc[0] if idx in fresh_df.index else None
+                                        found = update_row(fresh_df, idx, {
+                                            "Task": new_task,
+                                            "Owner": new_owner,
+                                            "Priority": new_priority,
+                                            "Progress": new_progress,
+                                            "Release Date": pd.Timestamp(new_release) if new_release else pd.NaT,
+                                            "Due Date": pd.Timestamp(new_due) if new_due else pd.NaT,
+                                            "GR/Mail Object": f"{new_gr}\n{new_mail}" if new_gr or new_mail else "",
+                                            "Notes": new_notes,
+                                        })
+
+                                        if not found:
+                                            st.warning("⚠️ This task was deleted in the meantime")
+                                        elif row_hashes(fresh_df.loc[[idx]]).iloc[0] == before:
+                                            st.info("ℹ️ No changes to save")
+                                        elif update_row(fresh_df, idx, {"Last Update": pd.Timestamp.now()}) and save_to_gsheet(fresh_df, "Projects"):
                                             st.success("✅ Changes saved!")
-                                            time.sleep(1)
+                                            pause_before_rerun(1)
                                             st.rerun()
 
                                 else:
@@ -1067,31 +2378,28 @@ if st.session_state.section == "Projects":
                                     )
 
                                     if notes != current_notes:
-                                        df.loc[idx, "Notes"] = notes
-                                        df.loc[idx, "Last Update"] = pd.Timestamp.now()
-                                        save_to_gsheet(df, "Projects")
-                                        st.success("💾 Notes saved", icon="✅")
+                                        fresh_df = load_from_gsheet("Projects")
+                                        if update_row(fresh_df, idx, {"Notes": notes, "Last Update": pd.Timestamp.now()}) and save_to_gsheet(fresh_df, "Projects"):
+                                            st.success("💾 Notes saved", icon="✅")
 
                                     current_status = r["Progress"]
                                     status = st.radio(
                                         "Status",
                                         options=progress_values,
-                                        index=progress_values.index(current_status),
+                                        index=progress_values.index(current_status) if current_status in progress_values else 0,
                                         key=f"status_radio_{project}_{r['Task']}_{idx}",
                                         horizontal=True
                                     )
 
                                     if status != current_status:
-                                        fresh_df = load_from_gsheet("Projects", PROJECT_COLUMNS, date_cols=["Release Date", "Due Date", "Last Update"])
-                                        fresh_df.loc[idx, "Progress"] = status
-                                        fresh_df.loc[idx, "Last Update"] = pd.Timestamp.now()
-                                        if save_to_gsheet(fresh_df, "Projects"):
-                                            time.sleep(0.5)
+                                        fresh_df = load_from_gsheet("Projects")
+                                        if update_row(fresh_df, idx, {"Progress": status, "Last Update": pd.Timestamp.now()}) and save_to_gsheet(fresh_df, "Projects"):
+                                            pause_before_rerun(0.5)
                                             st.rerun()
 
                             with cols[1]:
                                 if st.button("🗑️", key=f"delete_task_{project}_{r['Task']}"):
-                                    st.session_state.confirm_delete_task = (project, r['Task'])
+                                    st.session_state.confirm_delete_task = idx
                                     st.rerun()
 
                             st.divider()
@@ -1104,14 +2412,15 @@ if st.session_state.section == "Projects":
             for area in completed_areas:
                 st.markdown(f"#### 📍 {area}")
 
-                for project in sorted(completed_projects[area]):
-                    proj_df = df[df["Project"] == project]
-                    completion = int(proj_df["Progress"].map(progress_score).mean() * 100)
+                for project in paginate(completed_projects[area], key=f"proj_page_done_{area}"):
+                    info = summary.loc[project]
+                    if not project_toggle(project, project_header(project, info), "open_done_proj"):
+                        continue
 
-                    header_text = f"📁 {project} — {completion}%"
-                    expand = st.expander(header_text, expanded=False)
+                    proj_df = df.iloc[project_rows[project]]
+                    completion = int(info["Completion"] * 100)
 
-                    with expand:
+                    with st.container(border=True):
                         st.progress(completion / 100)
                         for idx, r in proj_df.iterrows():
                             st.markdown(f"**{r['Task']}**")
@@ -1127,7 +2436,7 @@ if st.session_state.section == "Projects":
     st.divider()
     if len(df) > 0:
         total_tasks = len(df)
-        completed_tasks = len(df[df["Progress"] == "Completed"])
+        completed_tasks = int((df["Progress"] == "Completed").sum())
         st.caption(f"📊 Total projects: {df['Project'].nunique()} | Tasks: {completed_tasks}/{total_tasks} completed ({int(completed_tasks/total_tasks*100) if total_tasks > 0 else 0}%)")
 
 # ======================================================
@@ -1135,35 +2444,61 @@ if st.session_state.section == "Projects":
 # ======================================================
 if st.session_state.section == "EOM":
 
+    eom_df = load_eom_data()
+    eom_status_df = load_eom_statuses()
+    eom_descriptions_df = load_eom_descriptions()
+    eom_df, eom_status_df = migrate_eom_layout(eom_df, eom_status_df)
+    eom_status_df = rollover_eom_statuses(eom_status_df)
+
     st.subheader("📅 End of Month Activities")
 
     if len(eom_df) > 0 and "Last Update" in eom_df.columns:
         try:
-            last_update_eom = pd.to_datetime(eom_df["Last Update"]).max()
+            last_update_eom = pd.concat([
+                pd.to_datetime(eom_df["Last Update"]),
+                pd.to_datetime(eom_status_df["Updated At"])
+            ]).max()
             st.caption(f"🕒 Last update: {last_update_eom.strftime('%d/%m/%Y %H:%M')}")
         except:
             st.caption(f"🕒 Last update: {pd.Timestamp.now().strftime('%d/%m/%Y %H:%M')}")
+    render_write_status(SECTION_SHEETS["EOM"])
+
+    # ✅ l'archivio serve solo se si guardano i mesi vecchi (selezionati o nei filtri)
+    if st.session_state.selected_old_months or st.session_state.show_eom_filters:
+        eom_archive_df = load_eom_archive()
+    else:
+        eom_archive_df = empty_frame(EOM_STATUS_SCHEMA)
 
     all_months = get_next_months()
-    all_eom_dates = [last_working_day(y, m) for y, m in all_months]
-    all_month_cols = [d.strftime("%d %B %Y") for d in all_eom_dates]
+    month_keys = {eom_month_label(y, m): eom_month_key(y, m) for y, m in all_months}
+    # i mesi più vecchi della finestra restano consultabili se hanno stati registrati
+    for key in pd.concat([eom_status_df["Month"], eom_archive_df["Month"]]).dropna().unique():
+        try:
+            y, m = (int(p) for p in str(key).split("-"))
+            month_keys.setdefault(eom_month_label(y, m), eom_month_key(y, m))
+        except ValueError:
+            continue
+    all_month_cols = sorted(month_keys, key=month_keys.get)
 
     visible_months = get_visible_months()
-    visible_eom_dates = [last_working_day(y, m) for y, m in visible_months]
-    visible_month_cols = [d.strftime("%d %B %Y") for d in visible_eom_dates]
+    visible_month_cols = [eom_month_label(y, m) for y, m in visible_months]
 
     current_month_col = visible_month_cols[4]
     old_month_cols = [col for col in all_month_cols if col not in visible_month_cols]
 
+    # ✅ si ricostruiscono solo le colonne dei mesi mostrati
+    selected_old_cols = [col for col in old_month_cols if col in st.session_state.selected_old_months]
+    display_month_cols = selected_old_cols + visible_month_cols
+    display_month_keys = {col: month_keys[col] for col in display_month_cols}
+
     for col in EOM_BASE_COLUMNS:
         if col not in eom_df.columns:
             eom_df[col] = False if col == "🗑️ Delete" else ""
 
-    for c in all_month_cols:
-        if c not in eom_df.columns:
-            eom_df[c] = EOM_WHITE
-
-    eom_df = clean_eom_dataframe(eom_df, all_month_cols)
+    if selected_old_cols:
+        eom_df = pivot_eom_statuses(eom_df, pd.concat([eom_archive_df, eom_status_df], ignore_index=True), display_month_keys)
+    else:
+        eom_df = pivot_eom_statuses(eom_df, eom_status_df, display_month_keys)
 
     eom_full_df = eom_df.copy()
     eom_view_df = eom_df.copy()
@@ -1214,7 +2549,7 @@ if st.session_state.section == "EOM":
                     selected_old = st.multiselect(
                         "📅 Show old months",
                         options=old_month_cols,
-                        default=st.session_state.selected_old_months,
+                        default=selected_old_cols,
                         key=f"old_months_select_{st.session_state.reset_eom_filters_flag}",
                         help="Select which old months to display"
                     )
@@ -1270,14 +2605,24 @@ if st.session_state.section == "EOM":
             col1, col2 = st.columns([1, 4])
             with col1:
                 if st.button(f"🗑️ Delete {len(selected_to_delete)} selected", type="primary", key="confirm_bulk_delete"):
-                    fresh_eom = load_from_gsheet("EOM", EOM_BASE_COLUMNS)
-                    fresh_eom = fresh_eom.drop(selected_to_delete).reset_index(drop=True)
-                    fresh_eom = renumber_eom_ids(fresh_eom)
-
-                    if save_to_gsheet(fresh_eom, "EOM"):
+                    fresh_eom = load_from_gsheet("EOM")
+                    deleted = fresh_eom.index.intersection(selected_to_delete)
+                    deleted_macros = set(fresh_eom.loc[deleted, "ID Macro"])
+                    fresh_eom = fresh_eom.drop(deleted)
+                    fresh_eom, renumbered = renumber_ids_incremental(fresh_eom, deleted_macros)
+                    fresh_eom = stamp_rows(fresh_eom, renumbered)
+
+                    saved = save_to_gsheet(fresh_eom, "EOM")
+                    for status_sheet in (EOM_STATUS_SHEET, EOM_ARCHIVE_SHEET):
+                        fresh_status = load_from_gsheet(status_sheet)
+                        orphans = ~fresh_status["Key"].isin(fresh_eom["Key"])
+                        if saved and orphans.any():
+                            saved = save_to_gsheet(fresh_status[~orphans], status_sheet)
+
+                    if saved:
                         st.success(f"✅ {len(selected_to_delete)} activities deleted and IDs renumbered!")
                         st.session_state.eom_bulk_delete = False
-                        time.sleep(1)
+                        pause_before_rerun(1)
                         st.rerun()
         else:
             st.info("👆 Select activities above to delete them")
@@ -1323,8 +2668,9 @@ if st.session_state.section == "EOM":
                 macro_for_micro = str(st.session_state.get("eom_macro", "")).strip() or (str(default_macro).strip() if default_macro else "")
                 if macro_for_micro:
                     tmp = existing_in_area.copy()
-                    tmp["__micro_num"] = tmp["ID Micro"].apply(lambda x: parse_id(x)[1] if parse_id(x)[0] is not None else None)
-                    tmp["__macro_num_from_micro"] = tmp["ID Micro"].apply(lambda x: parse_id(x)[0])
+                    micro_ids = parse_ids(tmp["ID Micro"])
+                    tmp["__micro_num"] = micro_ids["micro"]
+                    tmp["__macro_num_from_micro"] = micro_ids["macro"]
                     try:
                         macro_num = int(str(macro_for_micro).split(".")[0])
                     except:
@@ -1350,7 +2696,7 @@ if st.session_state.section == "EOM":
             if not activity:
                 st.error("❌ Activity name is required!")
             else:
-                fresh_eom = load_from_gsheet("EOM", EOM_BASE_COLUMNS)
+                fresh_eom = load_from_gsheet("EOM")
 
                 next_order = fresh_eom["Order"].max() + 1 if len(fresh_eom) > 0 else 0
                 row = {
@@ -1362,31 +2708,28 @@ if st.session_state.section == "EOM":
                     "Files": files,
                     "🗑️ Delete": False,
                     "Last Update": pd.Timestamp.now(),
-                    "Order": next_order
+                    "Order": next_order,
+                    "Key": new_row_key()
                 }
-                for c in all_month_cols:
-                    row[c] = EOM_WHITE
 
                 fresh_eom = pd.concat([fresh_eom, pd.DataFrame([row])], ignore_index=True)
-                fresh_eom = renumber_eom_ids(fresh_eom)
+                fresh_eom, renumbered = renumber_ids_incremental(fresh_eom, {id_macro})
+                fresh_eom = stamp_rows(fresh_eom, renumbered)
 
                 if save_to_gsheet(fresh_eom, "EOM"):
                     st.success(f"✅ Activity '{activity}' added!")
-                    time.sleep(1)
+                    pause_before_rerun(1)
                     st.rerun()
 
     # =========================
     # EOM EDIT MODE
     # =========================
     if st.session_state.eom_edit_mode and not st.session_state.eom_bulk_delete and len(eom_view_df) > 0:
-        eom_view_df = eom_view_df.sort_values('Order').reset_index(drop=True)
+        eom_view_df = eom_view_df.sort_values('Order')
         eom_view_df = sort_eom_by_ids(eom_view_df)
 
-        display_month_cols = visible_month_cols.copy()
-        if st.session_state.selected_old_months:
-            selected_sorted = sorted(st.session_state.selected_old_months, key=lambda x: all_month_cols.index(x))
-            display_month_cols = selected_sorted + display_month_cols
-            st.info(f"📅 Showing {len(selected_sorted)} old month(s) + {len(visible_month_cols)} current months")
+        if selected_old_cols:
+            st.info(f"📅 Showing {len(selected_old_cols)} old month(s) + {len(visible_month_cols)} current months")
 
         edit_cols = ["Area", "ID Macro", "ID Micro", "Activity", "Frequency", "Files"] + display_month_cols + ["Order"]
         edit_df = eom_view_df[edit_cols].copy()
@@ -1412,53 +2755,39 @@ if st.session_state.section == "EOM":
                 width="medium" if is_current else "small"
             )
 
-        edited = st.data_editor(
+        sync_editor("eom_edit_editor", edit_df)
+        st.data_editor(
             edit_df,
             use_container_width=True,
             num_rows="fixed",
             hide_index=True,
             column_config=col_cfg,
             disabled=["Order"],
-            key="eom_edit_editor"
+            key=editor_key("eom_edit_editor")
         )
 
-        edited_original_names = edited.copy()
-        if current_month_display in edited_original_names.columns:
-            edited_original_names = edited_original_names.rename(columns={current_month_display: current_month_col})
-
-        def df_to_comparable_dict(_df):
-            return _df.to_dict('records')
-
-        current_state = df_to_comparable_dict(edited)
-
-        if st.session_state.eom_last_saved_state is None:
-            st.session_state.eom_last_saved_state = df_to_comparable_dict(edit_df)
+        changes = [(key, current_month_col if col == current_month_display else col, value)
+                   for key, col, value in editor_changes("eom_edit_editor", edit_df)]
+        if changes:
+            base_cols = ["Area", "ID Macro", "ID Micro", "Activity", "Frequency", "Files"]
+            saved = upsert_eom_statuses(eom_status_changes(changes, display_month_keys))
 
-        if current_state != st.session_state.eom_last_saved_state:
-            fresh_full = load_from_gsheet("EOM", EOM_BASE_COLUMNS)
+            base_changes = [c for c in changes if c[1] in base_cols]
+            if base_changes:
+                fresh_full = load_from_gsheet("EOM")
 
-            for c in all_month_cols:
-                if c not in fresh_full.columns:
-                    fresh_full[c] = EOM_WHITE
+                keys = apply_cell_changes(fresh_full, base_changes)
 
-            if "Order" not in fresh_full.columns:
-                fresh_full["Order"] = range(len(fresh_full))
-            fresh_full["Order"] = pd.to_numeric(fresh_full["Order"], errors='coerce').fillna(0).astype(int)
+                touched_macros = {edit_df.at[key, "ID Macro"] for key, col, _ in base_changes if col in ("ID Macro", "ID Micro")}
+                touched_macros |= {value for _, col, value in base_changes if col == "ID Macro"}
+                fresh_full, renumbered = renumber_ids_incremental(fresh_full, touched_macros)
+                fresh_full = stamp_rows(fresh_full, renumbered | fresh_full.index.isin(keys))
+                saved = save_to_gsheet(fresh_full, "EOM") and saved
 
-            for _, r in edited_original_names.iterrows():
-                o = int(r["Order"])
-                mask = fresh_full["Order"] == o
-                if mask.any():
-                    for c in ["Area", "ID Macro", "ID Micro", "Activity", "Frequency", "Files"] + display_month_cols:
-                        if c in fresh_full.columns and c in edited_original_names.columns:
-                            fresh_full.loc[mask, c] = r[c]
-
-            fresh_full["Last Update"] = pd.Timestamp.now()
-            fresh_full = renumber_eom_ids(fresh_full)
-            fresh_full = clean_eom_dataframe(fresh_full, all_month_cols)
-
-            if save_to_gsheet(fresh_full, "EOM"):
-                st.session_state.eom_last_saved_state = current_state
+            if saved:
+                reset_editor("eom_edit_editor")
+                pause_before_rerun(0.3)
+                st.rerun()
 
         st.divider()
 
@@ -1466,14 +2795,11 @@ if st.session_state.section == "EOM":
     # EOM VIEW MODE + DESCRIPTION
     # =========================
     if not st.session_state.eom_edit_mode and not st.session_state.eom_bulk_delete and len(eom_view_df) > 0:
-        eom_view_df = eom_view_df.sort_values('Order').reset_index(drop=True)
+        eom_view_df = eom_view_df.sort_values('Order')
         eom_view_df = sort_eom_by_ids(eom_view_df)
 
-        display_month_cols = visible_month_cols.copy()
-        if st.session_state.selected_old_months:
-            selected_sorted = sorted(st.session_state.selected_old_months, key=lambda x: all_month_cols.index(x))
-            display_month_cols = selected_sorted + display_month_cols
-            st.info(f"📅 Showing {len(selected_sorted)} old month(s) + {len(visible_month_cols)} current months")
+        if selected_old_cols:
+            st.info(f"📅 Showing {len(selected_old_cols)} old month(s) + {len(visible_month_cols)} current months")
 
         display_cols = ["Area", "ID Macro", "ID Micro", "Activity", "Frequency", "Files"] + display_month_cols
         display_df = eom_view_df[display_cols].copy()
@@ -1501,9 +2827,6 @@ if st.session_state.section == "EOM":
                 width="medium" if is_current else "small"
             )
 
-        if 'eom_view_snapshot' not in st.session_state:
-            st.session_state.eom_view_snapshot = display_df_renamed.copy()
-
         st.markdown("### 📊 Status Table")
 
         activity_display_list = []
@@ -1520,13 +2843,14 @@ if st.session_state.section == "EOM":
         selected_display = st.selectbox("📝 View/Edit Description for:", options=activity_options, index=0, key="activity_selector")
         selected_activity_name = activity_mapping.get(selected_display, None)
 
-        edited = st.data_editor(
+        sync_editor("eom_editor", display_df_renamed)
+        st.data_editor(
             display_df_renamed,
             use_container_width=True,
             num_rows="fixed",
             column_config=column_config,
             hide_index=True,
-            key="eom_editor",
+            key=editor_key("eom_editor"),
             disabled=["Area", "ID Macro", "ID Micro", "Activity", "Frequency", "Files"]
         )
 
@@ -1538,10 +2862,10 @@ if st.session_state.section == "EOM":
 
         if len(selected_rows) > 0:
             selected_idx = selected_rows[0]
-            selected_activity = eom_view_df.iloc[selected_idx]["Activity"]
-            selected_area = eom_view_df.iloc[selected_idx]["Area"]
-            selected_macro = eom_view_df.iloc[selected_idx]["ID Macro"]
-            selected_micro = eom_view_df.iloc[selected_idx]["ID Micro"]
+            selected_activity = eom_view_df.loc[selected_idx, "Activity"]
+            selected_area = eom_view_df.loc[selected_idx, "Area"]
+            selected_macro = eom_view_df.loc[selected_idx, "ID Macro"]
+            selected_micro = eom_view_df.loc[selected_idx, "ID Micro"]
 
             st.divider()
             st.markdown(f"### 📝 Description for: **{selected_activity}**")
@@ -1577,14 +2901,14 @@ if st.session_state.section == "EOM":
                 col_save, col_cancel = st.columns(2)
                 with col_save:
                     if st.button("💾 Save Description", type="primary", key="save_desc_btn", use_container_width=True):
-                        fresh_descriptions = load_from_gsheet(EOM_DESCRIPTIONS_SHEET, EOM_DESCRIPTIONS_COLUMNS, date_cols=["Last Update"])
+                        fresh_descriptions = load_from_gsheet(EOM_DESCRIPTIONS_SHEET)
                         if len(fresh_descriptions) == 0:
                             fresh_descriptions = pd.DataFrame(columns=EOM_DESCRIPTIONS_COLUMNS)
 
                         if save_activity_description(selected_activity, new_description, fresh_descriptions, EOM_DESCRIPTIONS_SHEET):
                             st.success("✅ Description saved successfully!")
                             st.session_state.description_edit_mode = False
-                            time.sleep(1)
+                            pause_before_rerun(1)
                             st.rerun()
                         else:
                             st.error("❌ Failed to save description")
@@ -1599,41 +2923,14 @@ if st.session_state.section == "EOM":
                 else:
                     st.info("📝 No description available yet. Click '✏️ Edit' to add one.")
 
-        changes_detected = False
-        edited_original_names = edited.rename(columns={current_month_display: current_month_col})
-
-        for month_col in display_month_cols:
-            if month_col in eom_view_df.columns and month_col in edited_original_names.columns:
-                if not edited_original_names[month_col].equals(eom_view_df[month_col]):
-                    changes_detected = True
-                    break
-
-        if changes_detected:
-            fresh_full = load_from_gsheet("EOM", EOM_BASE_COLUMNS)
+        changes = [(key, current_month_col if col == current_month_display else col, value)
+                   for key, col, value in editor_changes("eom_editor", display_df_renamed)]
+        status_changes = eom_status_changes(changes, display_month_keys)
 
-            for c in all_month_cols:
-                if c not in fresh_full.columns:
-                    fresh_full[c] = EOM_WHITE
-
-            if "Order" not in fresh_full.columns:
-                fresh_full["Order"] = range(len(fresh_full))
-            fresh_full["Order"] = pd.to_numeric(fresh_full["Order"], errors='coerce').fillna(0).astype(int)
-
-            if "Order" in eom_view_df.columns:
-                for idx, r in edited_original_names.iterrows():
-                    o = int(eom_view_df.iloc[idx]["Order"])
-                    mask = fresh_full["Order"] == o
-                    if mask.any():
-                        for c in display_month_cols:
-                            if c in fresh_full.columns and c in edited_original_names.columns:
-                                fresh_full.loc[mask, c] = r[c]
-
-            fresh_full["Last Update"] = pd.Timestamp.now()
-            fresh_full = clean_eom_dataframe(fresh_full, all_month_cols)
-
-            if save_to_gsheet(fresh_full, "EOM"):
-                st.session_state.eom_view_snapshot = edited.copy()
-                time.sleep(0.3)
+        if status_changes:
+            if upsert_eom_statuses(status_changes):
+                reset_editor("eom_editor")
+                pause_before_rerun(0.3)
                 st.rerun()
 
         st.divider()
@@ -1671,6 +2968,9 @@ if st.session_state.section == "EOM":
 # ======================================================
 if st.session_state.section == "AdHoc":
 
+    adhoc_df = ensure_row_keys(load_adhoc_data(), ADHOC_SHEET_NAME)
+    adhoc_descriptions_df = load_adhoc_descriptions()
+
     st.subheader("🧩 Ad Hoc Activities")
 
     if len(adhoc_df) > 0 and "Last Update" in adhoc_df.columns:
@@ -1679,15 +2979,11 @@ if st.session_state.section == "AdHoc":
             st.caption(f"🕒 Last update: {last_update_adhoc.strftime('%d/%m/%Y %H:%M')}")
         except:
             st.caption(f"🕒 Last update: {pd.Timestamp.now().strftime('%d/%m/%Y %H:%M')}")
+    render_write_status(SECTION_SHEETS["AdHoc"])
 
     adhoc_full_df = adhoc_df.copy()
     adhoc_view_df = adhoc_df.copy()
 
-    # normalize status
-    if "Status" in adhoc_full_df.columns:
-        adhoc_full_df["Status"] = clean_status_series(adhoc_full_df["Status"])
-        adhoc_view_df["Status"] = clean_status_series(adhoc_view_df["Status"])
-
     col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
     with col1:
         st.caption("📌 Activities without fixed recurrence (track status + last done datetime)")
@@ -1756,42 +3052,41 @@ if st.session_state.section == "AdHoc":
         st.divider()
 
     # ======================================================
-    # BULK DELETE MODE (Order key, show sorted by Macro/Micro)
+    # BULK DELETE MODE (activity Key, show sorted by Macro/Micro)
     # ======================================================
     if st.session_state.adhoc_bulk_delete and len(adhoc_view_df) > 0:
         st.warning("🗑️ **Delete Mode**: Select activities to delete")
 
         adhoc_view_df = sort_by_ids(adhoc_view_df, "ID Macro", "ID Micro", "Order")
 
-        selected_to_delete_orders = []
+        selected_to_delete = []
         for idx, row in adhoc_view_df.iterrows():
             c1, c2 = st.columns([1, 10])
             with c1:
                 if st.checkbox("", key=f"adhoc_bulk_select_{idx}"):
-                    selected_to_delete_orders.append(int(row["Order"]))
+                    selected_to_delete.append(idx)
             with c2:
                 st.write(f"**{row['Activity']}** ({row['Area']} - {row['ID Macro']}/{row['ID Micro']})")
 
         st.divider()
 
-        if selected_to_delete_orders:
+        if selected_to_delete:
             colA, colB = st.columns([1, 4])
             with colA:
-                if st.button(f"🗑️ Delete {len(selected_to_delete_orders)} selected", type="primary", key="adhoc_confirm_bulk_delete"):
-                    fresh = load_from_gsheet(ADHOC_SHEET_NAME, ADHOC_COLUMNS, date_cols=["Last Done", "Last Update"])
-                    fresh["Order"] = pd.to_numeric(fresh["Order"], errors="coerce").fillna(0).astype(int)
+                if st.button(f"🗑️ Delete {len(selected_to_delete)} selected", type="primary", key="adhoc_confirm_bulk_delete"):
+                    fresh = load_from_gsheet(ADHOC_SHEET_NAME)
 
-                    fresh = fresh[~fresh["Order"].isin(selected_to_delete_orders)].reset_index(drop=True)
+                    deleted = fresh.index.intersection(selected_to_delete)
+                    deleted_macros = set(fresh.loc[deleted, "ID Macro"])
+                    fresh = fresh.drop(deleted)
 
-                    fresh = fresh.sort_values("Order").reset_index(drop=True)
-                    fresh["Order"] = range(len(fresh))
-                    fresh = renumber_ids(fresh, "ID Macro", "ID Micro")
+                    fresh, renumbered = renumber_ids_incremental(fresh, deleted_macros)
                     fresh["Status"] = clean_status_series(fresh["Status"]) if "Status" in fresh.columns else fresh.get("Status", EOM_WHITE)
-                    fresh["Last Update"] = pd.Timestamp.now()
+                    fresh = stamp_rows(fresh, renumbered)
 
                     if save_to_gsheet(fresh, ADHOC_SHEET_NAME):
                         st.session_state.adhoc_bulk_delete = False
-                        time.sleep(0.5)
+                        pause_before_rerun(0.5)
                         st.rerun()
         else:
             st.info("👆 Select activities above to delete them")
@@ -1840,8 +3135,9 @@ if st.session_state.section == "AdHoc":
                 macro_for_micro = str(st.session_state.get("adhoc_macro", "")).strip() or (str(default_macro).strip() if default_macro else "")
                 if macro_for_micro:
                     tmp = existing_in_area.copy()
-                    tmp["__micro_num"] = tmp["ID Micro"].apply(lambda x: parse_id(x)[1] if parse_id(x)[0] is not None else None)
-                    tmp["__macro_num_from_micro"] = tmp["ID Micro"].apply(lambda x: parse_id(x)[0])
+                    micro_ids = parse_ids(tmp["ID Micro"])
+                    tmp["__micro_num"] = micro_ids["micro"]
+                    tmp["__macro_num_from_micro"] = micro_ids["macro"]
 
                     try:
                         macro_num = int(str(macro_for_micro).split(".")[0])
@@ -1869,10 +3165,7 @@ if st.session_state.section == "AdHoc":
             if not activity:
                 st.error("❌ Activity name is required!")
             else:
-                fresh = load_from_gsheet(ADHOC_SHEET_NAME, ADHOC_COLUMNS, date_cols=["Last Done", "Last Update"])
-                if "Order" not in fresh.columns:
-                    fresh["Order"] = range(len(fresh))
-                fresh["Order"] = pd.to_numeric(fresh["Order"], errors="coerce").fillna(0).astype(int)
+                fresh = load_from_gsheet(ADHOC_SHEET_NAME)
 
                 next_order = int(fresh["Order"].max() + 1) if len(fresh) > 0 else 0
                 parsed_last_done = pd.to_datetime(last_done, errors="coerce") if last_done else pd.NaT
@@ -1887,16 +3180,18 @@ if st.session_state.section == "AdHoc":
                     "Notes": notes,
                     "🗑️ Delete": False,
                     "Last Update": pd.Timestamp.now(),
-                    "Order": next_order
+                    "Order": next_order,
+                    "Key": new_row_key()
                 }
 
                 fresh = pd.concat([fresh, pd.DataFrame([row])], ignore_index=True)
-                fresh = renumber_ids(fresh, "ID Macro", "ID Micro")
+                fresh, renumbered = renumber_ids_incremental(fresh, {id_macro})
+                fresh = stamp_rows(fresh, renumbered)
                 if "Status" in fresh.columns:
                     fresh["Status"] = clean_status_series(fresh["Status"])
 
                 if save_to_gsheet(fresh, ADHOC_SHEET_NAME):
-                    time.sleep(0.5)
+                    pause_before_rerun(0.5)
                     st.rerun()
 
     # ======================================================
@@ -1912,57 +3207,33 @@ if st.session_state.section == "AdHoc":
             "Status": st.column_config.SelectboxColumn("Status", options=EOM_STATUS_OPTIONS, default=EOM_WHITE, width="small")
         }
 
-        edited = st.data_editor(
+        sync_editor("adhoc_edit_editor", edit_df)
+        st.data_editor(
             edit_df,
             use_container_width=True,
             num_rows="fixed",
             hide_index=True,
             column_config=col_cfg,
             disabled=["Order"],
-            key="adhoc_edit_editor"
+            key=editor_key("adhoc_edit_editor")
         )
 
-        if "adhoc_last_saved_state" not in st.session_state:
-            st.session_state.adhoc_last_saved_state = edit_df.to_dict("records")
-
-        current_state = edited.to_dict("records")
-        if current_state != st.session_state.adhoc_last_saved_state:
-            fresh = load_from_gsheet(ADHOC_SHEET_NAME, ADHOC_COLUMNS, date_cols=["Last Done", "Last Update"])
-            if "Order" not in fresh.columns:
-                fresh["Order"] = range(len(fresh))
-            fresh["Order"] = pd.to_numeric(fresh["Order"], errors="coerce").fillna(0).astype(int)
-
-            for _, r in edited.iterrows():
-                o = int(r["Order"])
-                mask = fresh["Order"] == o
-                if mask.any():
-                    for c in ["Area", "ID Macro", "ID Micro", "Activity", "Status", "Last Done", "Notes"]:
-                        if c == "Last Done":
-                            fresh.loc[mask, c] = pd.to_datetime(r[c], errors="coerce")
-                        elif c == "Status":
-                            fresh.loc[mask, c] = r[c] if str(r[c]).strip() in EOM_STATUS_OPTIONS else EOM_WHITE
-                        else:
-                            fresh.loc[mask, c] = r[c]
+        changes = editor_changes("adhoc_edit_editor", edit_df)
+        if changes:
+            fresh = load_from_gsheet(ADHOC_SHEET_NAME)
+            touched_macros = {edit_df.at[key, "ID Macro"] for key, col, _ in changes if col in ("ID Macro", "ID Micro")}
+            touched_macros |= {value for _, col, value in changes if col == "ID Macro"}
 
-                    # auto: se status 🟢 e Last Done vuoto -> now
-                    try:
-                        if str(r["Status"]).strip() == EOM_GREEN:
-                            cur_ld = fresh.loc[mask, "Last Done"].iloc[0]
-                            if pd.isna(cur_ld):
-                                fresh.loc[mask, "Last Done"] = pd.Timestamp.now()
-                    except:
-                        pass
+            keys = apply_cell_changes(fresh, changes)
+            # auto: se status 🟢 e Last Done vuoto -> now
+            fill_last_done(fresh, keys)
 
-            fresh["Last Update"] = pd.Timestamp.now()
-            fresh = fresh.sort_values("Order").reset_index(drop=True)
-            fresh["Order"] = range(len(fresh))
-            fresh = renumber_ids(fresh, "ID Macro", "ID Micro")
-            if "Status" in fresh.columns:
-                fresh["Status"] = clean_status_series(fresh["Status"])
+            fresh, renumbered = renumber_ids_incremental(fresh, touched_macros)
+            fresh = stamp_rows(fresh, renumbered | fresh.index.isin(keys))
 
             if save_to_gsheet(fresh, ADHOC_SHEET_NAME):
-                st.session_state.adhoc_last_saved_state = current_state
-                time.sleep(0.3)
+                reset_editor("adhoc_edit_editor")
+                pause_before_rerun(0.3)
                 st.rerun()
 
         st.divider()
@@ -2001,13 +3272,14 @@ if st.session_state.section == "AdHoc":
         )
         selected_activity_name = mapping.get(selected_display, None)
 
-        edited = st.data_editor(
+        sync_editor("adhoc_view_editor", display_df)
+        st.data_editor(
             display_df,
             use_container_width=True,
             num_rows="fixed",
             hide_index=True,
             column_config=column_config,
-            key="adhoc_view_editor"
+            key=editor_key("adhoc_view_editor")
         )
 
         if selected_activity_name is not None:
@@ -2043,14 +3315,14 @@ if st.session_state.section == "AdHoc":
                     col_save, col_cancel = st.columns(2)
                     with col_save:
                         if st.button("💾 Save Description", type="primary", key="adhoc_save_desc_btn", use_container_width=True):
-                            fresh_desc = load_from_gsheet(ADHOC_DESCRIPTIONS_SHEET, ADHOC_DESCRIPTIONS_COLUMNS, date_cols=["Last Update"])
+                            fresh_desc = load_from_gsheet(ADHOC_DESCRIPTIONS_SHEET)
                             if len(fresh_desc) == 0:
                                 fresh_desc = pd.DataFrame(columns=ADHOC_DESCRIPTIONS_COLUMNS)
 
                             if save_activity_description(selected_activity_name, new_description, fresh_desc, ADHOC_DESCRIPTIONS_SHEET):
                                 st.success("✅ Description saved successfully!")
                                 st.session_state.adhoc_description_edit_mode = False
-                                time.sleep(0.5)
+                                pause_before_rerun(0.5)
                                 st.rerun()
                             else:
                                 st.error("❌ Failed to save description")
@@ -2066,47 +3338,21 @@ if st.session_state.section == "AdHoc":
                         st.info("📝 No description available yet. Click '✏️ Edit' to add one.")
 
         # quick save (Status / Last Done / Notes)
-        changes_detected = False
-        for c in ["Status", "Last Done", "Notes"]:
-            if c in edited.columns and c in display_df.columns:
-                if not edited[c].equals(display_df[c]):
-                    changes_detected = True
-                    break
+        changes = [c for c in editor_changes("adhoc_view_editor", display_df) if c[1] in ("Status", "Last Done", "Notes")]
 
-        if changes_detected:
-            fresh = load_from_gsheet(ADHOC_SHEET_NAME, ADHOC_COLUMNS, date_cols=["Last Done", "Last Update"])
-            if "Order" not in fresh.columns:
-                fresh["Order"] = range(len(fresh))
-            fresh["Order"] = pd.to_numeric(fresh["Order"], errors="coerce").fillna(0).astype(int)
-
-            for idx, r in edited.iterrows():
-                o = int(adhoc_view_df.iloc[idx]["Order"])
-                mask = fresh["Order"] == o
-                if mask.any():
-                    if "Status" in r:
-                        fresh.loc[mask, "Status"] = r["Status"] if str(r["Status"]).strip() in EOM_STATUS_OPTIONS else EOM_WHITE
-                    if "Notes" in r:
-                        fresh.loc[mask, "Notes"] = r["Notes"]
-                    if "Last Done" in r:
-                        fresh.loc[mask, "Last Done"] = pd.to_datetime(r["Last Done"], errors="coerce")
+        if changes:
+            fresh = load_from_gsheet(ADHOC_SHEET_NAME)
 
-                    try:
-                        if str(r["Status"]).strip() == EOM_GREEN:
-                            cur_ld = fresh.loc[mask, "Last Done"].iloc[0]
-                            if pd.isna(cur_ld):
-                                fresh.loc[mask, "Last Done"] = pd.Timestamp.now()
-                    except:
-                        pass
+            keys = apply_cell_changes(fresh, changes)
+            fill_last_done(fresh, keys)
 
-            fresh["Last Update"] = pd.Timestamp.now()
-            fresh = fresh.sort_values("Order").reset_index(drop=True)
-            fresh["Order"] = range(len(fresh))
-            fresh = renumber_ids(fresh, "ID Macro", "ID Micro")
-            if "Status" in fresh.columns:
-                fresh["Status"] = clean_status_series(fresh["Status"])
+            # qui cambiano solo Status / Last Done / Notes: gli ID si toccano solo se non sono già in ordine
+            fresh, renumbered = renumber_ids_incremental(fresh, set())
+            fresh = stamp_rows(fresh, renumbered | fresh.index.isin(keys))
 
             if save_to_gsheet(fresh, ADHOC_SHEET_NAME):
-                time.sleep(0.3)
+                reset_editor("adhoc_view_editor")
+                pause_before_rerun(0.3)
                 st.rerun()
 
         st.divider()
@@ -0,0 +1,129 @@
+"""Caricamento delle funzioni di app.py per i test.
+
+app.py è uno script Streamlit: importarlo eseguirebbe tutta la pagina (e la connessione
+a Google Sheets). Qui si compilano solo le definizioni (funzioni, classi, costanti) e si
+lasciano fuori gli import di streamlit/Google e le risorse condivise (`X = get_x()`),
+che ogni test imposta da sé nel namespace restituito."""
+import ast
+import pathlib
+import threading
+
+import pytest
+
+APP_PATH = pathlib.Path(__file__).resolve().parent.parent / "app.py"
+SKIPPED_MODULES = ("streamlit", "google", "googleapiclient", "google_auth_httplib2", "httplib2")
+LOWERCASE_CONSTANTS = ("progress_values", "progress_score", "priority_values")
+
+
+class SessionState(dict):
+    """Come st.session_state: accesso sia per chiave sia per attributo"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class FakeStreamlit:
+    """Il minimo di `st` usato dalle funzioni testate: registra i messaggi mostrati"""
+
+    def __init__(self):
+        self.messages = []
+        self.session_state = SessionState()
+        self.number_inputs = {}
+
+    def _record(self, kind):
+        return lambda text, *args, **kwargs: self.messages.append((kind, text))
+
+    def __getattr__(self, name):
+        if name in ("warning", "error", "info", "success", "caption"):
+            return self._record(name)
+        raise AttributeError(name)
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, step=None, key=None):
+        return self.number_inputs.get(key, value)
+
+
+def _is_resource_call(node):
+    return any(
+        isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id.startswith("get_")
+        for n in ast.walk(node)
+    )
+
+
+def _keep(node):
+    if isinstance(node, ast.Import):
+        return not any(alias.name.split(".")[0] in SKIPPED_MODULES for alias in node.names)
+    if isinstance(node, ast.ImportFrom):
+        return (node.module or "").split(".")[0] not in SKIPPED_MODULES
+    if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+        node.decorator_list = []
+        return True
+    if isinstance(node, ast.Assign):
+        names = [t.id for t in node.targets if isinstance(t, ast.Name)]
+        return (
+            len(names) == len(node.targets)
+            and all(n.isupper() or n in LOWERCASE_CONSTANTS for n in names)
+            and not _is_resource_call(node.value)
+        )
+    return False
+
+
+def load_app():
+    tree = ast.parse(APP_PATH.read_text(encoding="utf-8"))
+    module = ast.Module(body=[node for node in tree.body if _keep(node)], type_ignores=[])
+    ns = {"__name__": "app_under_test", "st": FakeStreamlit()}
+    exec(compile(module, str(APP_PATH), "exec"), ns)
+    ns.update(
+        STORAGE_BACKEND="sqlite",
+        WRITE_BEHIND=False,
+        SHEET_SNAPSHOTS={},
+        SHEET_CACHE={},
+        SHEET_CACHE_LOCK=threading.Lock(),
+        REFRESHING_SHEETS=set(),
+        REFRESH_ERRORS={},
+        EOM_MAINTENANCE_LOCK=threading.Lock(),
+        WRITE_QUEUE=ns["get_write_queue"](),
+    )
+    return ns
+
+
+@pytest.fixture
+def app():
+    """Namespace con le funzioni di app.py; le modifiche ai globali valgono per le funzioni"""
+    return AppNamespace(load_app())
+
+
+@pytest.fixture
+def other_app(storage):
+    """Seconda istanza dell'app (un altro processo) sullo stesso file SQLite di `storage`"""
+    other = AppNamespace(load_app())
+    other.STORAGE = other.SQLiteBackend(storage.path)
+    return other
+
+
+class AppNamespace:
+    """Accesso per attributo ai globali delle funzioni di app.py (lettura e scrittura)"""
+
+    def __init__(self, ns):
+        object.__setattr__(self, "_ns", ns)
+
+    def __getattr__(self, name):
+        try:
+            return self._ns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self._ns[name] = value
+
+
+@pytest.fixture
+def storage(app, tmp_path):
+    """Backend SQLite su file temporaneo, già impostato come STORAGE"""
+    app.STORAGE = app.SQLiteBackend(str(tmp_path / "sheets.db"))
+    return app.STORAGE
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+SHEET = "Projects"
+
+
+@pytest.fixture
+def projects(app, storage, monkeypatch):
+    """Foglio Projects con due task nel backend SQLite; i tentativi non aspettano"""
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    header = app.dataframe_to_values(app.empty_frame(app.PROJECT_SCHEMA), SHEET)[0]
+    rows = [[""] * len(header) for _ in range(2)]
+    for i, row in enumerate(rows):
+        row[header.index("Task")] = f"t{i}"
+        row[header.index("Task ID")] = f"k{i}"
+    storage.create_sheet(SHEET, header)
+    storage.write(SHEET, [header] + rows, None, "full")
+    return storage
+
+
+def break_reads(storage, monkeypatch):
+    def read(sheet_names):
+        raise RuntimeError("backend down")
+    monkeypatch.setattr(storage, "read", read)
+
+
+def test_failed_first_load_is_not_cached_under_the_current_revision(app, projects, monkeypatch):
+    break_reads(projects, monkeypatch)
+    df = app._get_cached_sheets((SHEET,))[SHEET]
+    assert len(df) == 0
+    assert app.SHEET_CACHE[SHEET]["revision"] is None
+    assert app.st.messages[-1][0] == "error"
+
+    monkeypatch.undo()
+    # senza revisione e già scaduto: il run successivo rilegge davvero il foglio
+    df = app._get_cached_sheets((SHEET,))[SHEET]
+    assert df["Task"].tolist() == ["t0", "t1"]
+    assert app.SHEET_CACHE[SHEET]["revision"] == projects.read_revisions()[SHEET]
+
+
+def test_failed_reload_keeps_the_cached_frame(app, projects, monkeypatch):
+    app._get_cached_sheets((SHEET,))
+    entry = app.SHEET_CACHE[SHEET]
+    entry["loaded_at"] = entry["downloaded_at"] = 0
+    entry["revision"] = "old"
+
+    break_reads(projects, monkeypatch)
+    df = app._get_cached_sheets((SHEET,))[SHEET]
+    assert df["Task"].tolist() == ["t0", "t1"]
+    assert app.SHEET_CACHE[SHEET]["revision"] == "old"
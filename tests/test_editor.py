@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+
+def test_assign_row_keys_is_deterministic(app):
+    df = pd.DataFrame({"Activity": ["x", "x", "y"], "Key": ["", "", "k"]})
+    first, assigned = app.assign_row_keys(df, "Key")
+    second, _ = app.assign_row_keys(df, "Key")
+    assert assigned
+    assert first["Key"].tolist() == second["Key"].tolist()
+    assert first["Key"].iloc[2] == "k"
+    assert first["Key"].is_unique and all(len(k) == 12 for k in first["Key"].iloc[:2])
+
+
+@pytest.fixture
+def editor_app(app):
+    app.st.session_state.update(editor_versions={}, editor_digests={})
+    return app
+
+
+def test_sync_editor_resets_only_without_pending_edits(editor_app):
+    app = editor_app
+    before = pd.DataFrame({"Notes": ["a", "b"]}, index=["k1", "k2"])
+    after = pd.DataFrame({"Notes": ["new", "a", "b"]}, index=["k0", "k1", "k2"])
+
+    app.sync_editor("e", before)
+    app.st.session_state[app.editor_key("e")] = {"edited_rows": {"1": {"Notes": "B!"}}}
+    app.sync_editor("e", after)
+
+    # l'editor resta e la modifica in sospeso va ancora alla riga su cui è stata fatta
+    assert app.st.session_state.editor_versions == {}
+    assert app.st.messages[-1][0] == "warning"
+    assert app.editor_changes("e", after) == [("k2", "Notes", "B!")]
+
+    app.st.session_state[app.editor_key("e")] = {"edited_rows": {}}
+    app.sync_editor("e", after)
+    assert app.st.session_state.editor_versions == {"e": 1}
+    assert app.st.session_state.editor_digests["e"]["keys"] == ["k0", "k1", "k2"]
+
+
+def test_row_hashes_ignore_dtype_and_missing_representation(app):
+    a = pd.DataFrame({"x": pd.Series(["p", None], dtype="category"), "y": [1, 2]})
+    b = pd.DataFrame({"x": pd.Series(["p", ""], dtype=object), "y": [1, 2]})
+    assert (app.row_hashes(a).to_numpy() == app.row_hashes(b).to_numpy()).all()
+    b.loc[1, "y"] = 3
+    assert (app.row_hashes(a).to_numpy() != app.row_hashes(b).to_numpy()).tolist() == [False, True]
@@ -0,0 +1,178 @@
+import time
+
+import pandas as pd
+import pytest
+
+
+def test_clean_status_series_normalizes_to_known_dots(app):
+    raw = pd.Series([app.EOM_GREEN, f" {app.EOM_RED} ", None, "", "???"], dtype=object)
+    out = app.clean_status_series(raw)
+    assert out.dtype == app.STATUS_DTYPE
+    assert out.tolist() == [app.EOM_GREEN, app.EOM_RED, app.EOM_WHITE, app.EOM_WHITE, app.EOM_WHITE]
+
+
+def test_pivot_eom_statuses_adds_one_column_per_month(app):
+    eom = pd.DataFrame({"Key": ["a", "b"], "Activity": ["x", "y"]}, index=["a", "b"])
+    statuses = pd.DataFrame({
+        "Key": ["a", "a", "b", "a"],
+        "Month": ["2024-01", "2024-02", "2024-02", "2024-01"],
+        "Status": [app.EOM_RED, app.EOM_GREEN, app.EOM_GRAY, app.EOM_GREEN],
+    })
+    out = app.pivot_eom_statuses(eom, statuses, {"Jan": "2024-01", "Feb": "2024-02", "Mar": "2024-03"})
+
+    # a parità di (Key, mese) vale l'ultima riga
+    assert out["Jan"].tolist() == [app.EOM_GREEN, app.EOM_WHITE]
+    assert out["Feb"].tolist() == [app.EOM_GREEN, app.EOM_GRAY]
+    assert out["Mar"].tolist() == [app.EOM_WHITE, app.EOM_WHITE]
+    assert all(out[col].dtype == app.STATUS_DTYPE for col in ("Jan", "Feb", "Mar"))
+    assert "Jan" not in eom.columns
+
+
+LEGACY_MONTH = "29 March 2024"
+
+
+@pytest.fixture
+def eom_store(app, storage, monkeypatch):
+    """EOM nel vecchio formato (stati nelle colonne-mese, senza Key) e foglio stati vuoto"""
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    header = app.EOM_BASE_COLUMNS + [LEGACY_MONTH]
+    rows = [
+        ["A", "1", "", "first", "M", "", "False", "", "0", "", app.EOM_GREEN],
+        ["A", "1", "1.1", "second", "M", "", "False", "", "1", "", app.EOM_WHITE],
+    ]
+    storage.create_sheet("EOM", header)
+    storage.write("EOM", [header] + rows, None, "full")
+    app.create_sheet_if_not_exists(app.EOM_STATUS_SHEET, app.EOM_STATUS_COLUMNS)
+    return storage
+
+
+def sheet(storage, name):
+    return storage.read([name])[name]
+
+
+def test_migrate_eom_layout_moves_legacy_statuses(app, eom_store):
+    eom, statuses = app.migrate_eom_layout(app.load_from_gsheet("EOM"), app.load_from_gsheet(app.EOM_STATUS_SHEET))
+
+    saved_eom = sheet(eom_store, "EOM")
+    assert LEGACY_MONTH not in saved_eom[0]
+    keys = [row[saved_eom[0].index("Key")] for row in saved_eom[1:]]
+    assert all(keys) and keys == eom["Key"].tolist()
+    # solo gli stati non bianchi diventano righe
+    assert [row[:3] for row in sheet(eom_store, app.EOM_STATUS_SHEET)[1:]] == [[keys[0], "2024-03", app.EOM_GREEN]]
+    assert statuses["Key"].tolist() == [keys[0]]
+
+    # già migrato: nessuna altra scrittura
+    writes = []
+    app.save_to_gsheet = lambda *args, **kwargs: writes.append(args) or True
+    app.migrate_eom_layout(eom, statuses)
+    assert writes == []
+
+
+def test_migrate_eom_layout_keeps_keys_when_status_save_fails(app, eom_store):
+    save = app.save_to_gsheet
+    app.save_to_gsheet = lambda df, name, mode=None: False if name == app.EOM_STATUS_SHEET else save(df, name, mode)
+    app.migrate_eom_layout(app.load_from_gsheet("EOM"), app.load_from_gsheet(app.EOM_STATUS_SHEET))
+
+    # Key salvate, vecchie colonne ancora presenti: nessuno stato orfano
+    saved_eom = sheet(eom_store, "EOM")
+    assert LEGACY_MONTH in saved_eom[0]
+    keys = [row[saved_eom[0].index("Key")] for row in saved_eom[1:]]
+    assert all(keys)
+    assert sheet(eom_store, app.EOM_STATUS_SHEET)[1:] == []
+
+    app.save_to_gsheet = save
+    app.migrate_eom_layout(app.load_from_gsheet("EOM"), app.load_from_gsheet(app.EOM_STATUS_SHEET))
+    assert [row[0] for row in sheet(eom_store, app.EOM_STATUS_SHEET)[1:]] == [keys[0]]
+
+
+def test_migrate_eom_layout_skips_when_the_fresh_read_fails(app, eom_store, monkeypatch):
+    eom = app.load_from_gsheet("EOM")
+    statuses = app.load_from_gsheet(app.EOM_STATUS_SHEET)
+    monkeypatch.setattr(eom_store, "read", lambda names: (_ for _ in ()).throw(RuntimeError("down")))
+    writes = []
+    app.save_to_gsheet = lambda *args, **kwargs: writes.append(args) or True
+
+    assert app.migrate_eom_layout(eom, statuses) == (eom, statuses)
+    assert writes == []
+
+
+def test_upsert_eom_statuses_updates_and_appends(app, storage):
+    month = app.eom_archive_cutoff()
+    app.create_sheet_if_not_exists(app.EOM_STATUS_SHEET, app.EOM_STATUS_COLUMNS)
+    assert app.upsert_eom_statuses([("k1", month, app.EOM_RED), ("k2", month, app.EOM_WHITE)])
+    assert app.upsert_eom_statuses([("k1", month, app.EOM_GREEN)])
+
+    rows = sheet(storage, app.EOM_STATUS_SHEET)[1:]
+    # un bianco senza riga esistente non aggiunge nulla
+    assert [row[:3] for row in rows] == [["k1", month, app.EOM_GREEN]]
+
+
+def test_upsert_eom_statuses_keeps_rows_written_by_another_process(app, other_app, storage):
+    month = app.eom_archive_cutoff()
+    app.create_sheet_if_not_exists(app.EOM_STATUS_SHEET, app.EOM_STATUS_COLUMNS)
+    app.get_cached_sheets((app.EOM_STATUS_SHEET,))
+    other_app.get_cached_sheets((app.EOM_STATUS_SHEET,))
+
+    assert other_app.upsert_eom_statuses([("kB", month, app.EOM_RED)])
+    assert app.upsert_eom_statuses([("kA", month, app.EOM_GREEN)])
+
+    assert sorted(row[0] for row in sheet(storage, app.EOM_STATUS_SHEET)[1:]) == ["kA", "kB"]
+
+
+def test_upsert_eom_statuses_aborts_when_the_read_fails(app, storage, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    month = app.eom_archive_cutoff()
+    app.create_sheet_if_not_exists(app.EOM_STATUS_SHEET, app.EOM_STATUS_COLUMNS)
+    assert app.upsert_eom_statuses([("k1", month, app.EOM_RED)])
+
+    monkeypatch.setattr(storage, "read", lambda names: (_ for _ in ()).throw(RuntimeError("down")))
+    assert not app.upsert_eom_statuses([("k2", month, app.EOM_GREEN)])
+    monkeypatch.undo()
+    assert [row[0] for row in sheet(storage, app.EOM_STATUS_SHEET)[1:]] == ["k1"]
+
+
+@pytest.fixture
+def rollover_store(app, storage):
+    """Stati di un mese chiuso e di uno aperto nel foglio caldo, più un archivio già pieno"""
+    app.fetch_frames((app.EOM_STATUS_SHEET, app.EOM_ARCHIVE_SHEET))
+    header = app.EOM_STATUS_COLUMNS
+    storage.write(app.EOM_STATUS_SHEET, [header, ["k1", "2020-01", app.EOM_GREEN, ""], ["k1", "2999-01", app.EOM_RED, ""]], None, "full")
+    storage.write(app.EOM_ARCHIVE_SHEET, [header, ["k0", "2019-12", app.EOM_GRAY, ""], ["k1", "2020-01", app.EOM_RED, ""]], None, "full")
+    return storage
+
+
+def test_rollover_eom_statuses_archives_closed_months_once(app, rollover_store):
+    statuses = app.load_from_gsheet(app.EOM_STATUS_SHEET)
+    remaining = app.rollover_eom_statuses(statuses)
+
+    assert remaining["Month"].tolist() == ["2999-01"]
+    assert [row[:3] for row in sheet(rollover_store, app.EOM_STATUS_SHEET)[1:]] == [["k1", "2999-01", app.EOM_RED]]
+    # a parità di (Key, mese) vince il foglio caldo
+    assert [row[:3] for row in sheet(rollover_store, app.EOM_ARCHIVE_SHEET)[1:]] == [
+        ["k0", "2019-12", app.EOM_GRAY], ["k1", "2020-01", app.EOM_GREEN]
+    ]
+    assert rollover_store.read_revisions()[app.EOM_ROLLOVER_MARKER] == app.eom_archive_cutoff()
+
+    # una sessione con la cache vecchia filtra soltanto
+    writes = []
+    app.save_to_gsheet = lambda *args, **kwargs: writes.append(args) or True
+    assert app.rollover_eom_statuses(statuses)["Month"].tolist() == ["2999-01"]
+    assert writes == []
+
+
+def test_rollover_eom_statuses_skips_when_a_read_fails(app, rollover_store, monkeypatch):
+    statuses = app.load_from_gsheet(app.EOM_STATUS_SHEET)
+    archive_before = sheet(rollover_store, app.EOM_ARCHIVE_SHEET)
+    read = rollover_store.read
+
+    def read_without_archive(names):
+        if app.EOM_ARCHIVE_SHEET in names:
+            raise RuntimeError("down")
+        return read(names)
+    monkeypatch.setattr(rollover_store, "read", read_without_archive)
+
+    assert app.rollover_eom_statuses(statuses) is statuses
+    monkeypatch.undo()
+    assert sheet(rollover_store, app.EOM_ARCHIVE_SHEET) == archive_before
+    assert len(sheet(rollover_store, app.EOM_STATUS_SHEET)) == 3
+    assert app.EOM_ROLLOVER_MARKER not in rollover_store.read_revisions()
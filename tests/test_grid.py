@@ -0,0 +1,52 @@
+def test_col_letter(app):
+    assert [app.col_letter(n) for n in (0, 25, 26, 701, 702)] == ["A", "Z", "AA", "ZZ", "AAA"]
+
+
+def test_diff_grid_ranges_groups_contiguous_changes_per_row(app):
+    old = [["h1", "h2", "h3"], ["a", "b", "c"], ["d", "e", "f"]]
+    new = [["h1", "h2", "h3"], ["a", "B", "C"], ["D", "e", "F"]]
+    data, changed = app.diff_grid_ranges("S", old, new)
+    assert changed == 4
+    assert data == [
+        {"range": "S!B2:C2", "values": [["B", "C"]]},
+        {"range": "S!A3:A3", "values": [["D"]]},
+        {"range": "S!C3:C3", "values": [["F"]]},
+    ]
+
+
+def test_diff_grid_ranges_blanks_removed_rows_and_columns(app):
+    old = [["h1", "h2"], ["a", "b"], ["c", "d"]]
+    new = [["h1"], ["a"]]
+    data, changed = app.diff_grid_ranges("S", old, new)
+    assert changed == 4
+    assert data == [
+        {"range": "S!B1:B1", "values": [[""]]},
+        {"range": "S!B2:B2", "values": [[""]]},
+        {"range": "S!A3:B3", "values": [["", ""]]},
+    ]
+
+
+def test_diff_grid_ranges_identical_grids(app):
+    grid = [["h"], ["a"]]
+    assert app.diff_grid_ranges("S", grid, grid) == ([], 0)
+
+
+def test_normalize_grid_pads_short_rows(app):
+    assert app.normalize_grid([["a", "b"], ["c"], []]) == [["a", "b"], ["c", ""], ["", ""]]
+
+
+def test_write_values_falls_back_to_full_write_on_foreign_revision(app, storage):
+    calls = []
+    write = storage.write
+    storage.write = lambda name, values, previous, mode: calls.append(previous is not None) or write(name, values, previous, mode)
+
+    app.fetch_frames((app.ADHOC_SHEET_NAME,))
+    header = app.SHEET_SNAPSHOTS[app.ADHOC_SHEET_NAME]["values"][0]
+    rows = [[str(i)] * len(header) for i in range(3)]
+    app.write_values(app.ADHOC_SHEET_NAME, [header] + rows[:1], "delta")
+    app.write_values(app.ADHOC_SHEET_NAME, [header] + rows[:2], "delta")
+    write(app.ADHOC_SHEET_NAME, [header], None, "full")  # un altro processo riscrive il foglio
+    app.write_values(app.ADHOC_SHEET_NAME, [header] + rows, "delta")
+
+    assert calls == [False, True, False]
+    assert storage.read([app.ADHOC_SHEET_NAME])[app.ADHOC_SHEET_NAME] == [header] + rows
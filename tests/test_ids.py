@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("value", ["7", " 7 ", "7.2", "7.2.x", "7.", "x", "", None, "-1.3"])
+def test_parse_ids_matches_parse_id(app, value):
+    macro, micro = app.parse_id(value)
+    parsed = app.parse_ids(pd.Series([value], dtype=object)).iloc[0]
+    assert (None if pd.isna(parsed["macro"]) else int(parsed["macro"])) == macro
+    assert (None if pd.isna(parsed["micro"]) else int(parsed["micro"])) == micro
+
+
+
+def eom_rows(*ids):
+    return pd.DataFrame(
+        {"ID Macro": [m for m, _ in ids], "ID Micro": [u for _, u in ids]},
+        index=[f"k{i}" for i in range(len(ids))],
+    )
+
+
+def test_renumber_closes_gaps_without_reordering_rows(app):
+    df = eom_rows(("3", ""), ("3", "3.5"), ("1", ""), ("3", "3.7"), ("1", "1.4"))
+    out, changed = app.renumber_ids_incremental(df)
+    assert list(out.index) == list(df.index)
+    assert out["ID Macro"].tolist() == ["2", "2", "1", "2", "1"]
+    assert out["ID Micro"].tolist() == ["", "2.1", "", "2.2", "1.1"]
+    assert changed.tolist() == [True, True, False, True, True]
+
+
+def test_renumber_touches_only_affected_macros_when_macros_are_contiguous(app):
+    df = eom_rows(("1", ""), ("1", "1.3"), ("2", ""), ("2", "2.5"))
+    out, changed = app.renumber_ids_incremental(df, affected_macros=["1"])
+    assert out["ID Micro"].tolist() == ["", "1.1", "", "2.5"]
+    assert changed.tolist() == [False, True, False, False]
+
+
+def test_renumber_empty_frame(app):
+    df = eom_rows()
+    out, changed = app.renumber_ids_incremental(df)
+    assert len(out) == 0 and len(changed) == 0
+
+
+def test_stamp_rows_uses_the_renumber_mask(app):
+    df = eom_rows(("1", ""), ("1", "1.3"), ("2", ""), ("2", "2.1"))
+    df["Last Update"] = pd.Timestamp("2024-01-01")
+    out, renumbered = app.renumber_ids_incremental(df, affected_macros=["1"])
+    out = app.stamp_rows(out, renumbered | out.index.isin(["k3"]))
+    stamped = out["Last Update"] > pd.Timestamp("2024-01-01")
+    assert stamped.tolist() == [False, True, False, True]
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+
+def test_project_summary(app):
+    today = pd.Timestamp(date.today())
+    df = pd.DataFrame({
+        "Project": ["P1", "P2", "P1", "P1"],
+        "Area": ["A", "B", "A2", "A"],
+        "Progress": ["Completed", "Not started", "Not started", "Completed"],
+        "Due Date": [today - timedelta(days=9), today + timedelta(days=3), today - timedelta(days=1), pd.NaT],
+    })
+    summary, indices = app.project_summary(df)
+
+    assert list(summary.index) == ["P1", "P2"]
+    p1 = summary.loc["P1"]
+    assert p1["Area"] == "A"
+    assert p1["Tasks"] == 3 and p1["Completed"] == 2 and p1["Overdue"] == 1
+    assert p1["Next Due"] == today - timedelta(days=1)
+    assert p1["Completion"] == (2 * app.progress_score["Completed"] + app.progress_score["Not started"]) / 3
+    assert list(indices["P1"]) == [0, 2, 3]
+
+
+def test_project_summary_is_cached_with_the_sheet(app):
+    df = pd.DataFrame({
+        "Project": ["P1", "P2"],
+        "Area": ["A", "B"],
+        "Progress": ["Completed", "Not started"],
+        "Due Date": [pd.NaT, pd.NaT],
+    }, index=["k0", "k1"])
+    app._cache_frame("Projects", df)
+
+    first = app.cached_project_summary(df.copy())
+    assert app.cached_project_summary(df.copy()) is first
+    # una selezione di righe (filtri) ha il suo riepilogo
+    assert list(app.cached_project_summary(df.loc[["k1"]])[0].index) == ["P2"]
+
+    # nuova versione del foglio: nuova voce in cache, riepilogo ricalcolato
+    app._cache_frame("Projects", df.copy())
+    assert app.cached_project_summary(df.copy()) is not first
+
+
+def test_paginate_short_list_has_no_selector(app):
+    items = list(range(app.PROJECTS_PAGE_SIZE))
+    assert app.paginate(items, "page") == items
+    assert app.st.messages == []
+
+
+def test_paginate_returns_selected_page(app):
+    items = list(range(app.PROJECTS_PAGE_SIZE * 2 + 5))
+    app.st.number_inputs["page"] = 3
+    assert app.paginate(items, "page") == items[app.PROJECTS_PAGE_SIZE * 2:]
+    assert app.st.messages[-1] == ("caption", f"Showing projects {app.PROJECTS_PAGE_SIZE * 2 + 1}-{len(items)} of {len(items)}")
@@ -0,0 +1,58 @@
+import sqlite3
+from contextlib import closing
+
+HEADER = ["A", "B"]
+GRID = [HEADER, ["1", "x"], ["2", "y"], ["3", "z"]]
+
+
+def stored_rows(storage, sheet_name):
+    with closing(sqlite3.connect(storage.path)) as conn:
+        return dict(conn.execute("SELECT row_idx, data FROM sheet_rows WHERE sheet = ?", (sheet_name,)))
+
+
+def test_create_sheet_registers_title_and_header(storage):
+    storage.create_sheet("S", HEADER)
+    assert "S" in storage.sheet_titles()
+    assert storage.read(["S"]) == {"S": [HEADER]}
+    assert "S" in storage.read_revisions()
+
+
+def test_full_write_replaces_the_sheet(storage):
+    storage.create_sheet("S", HEADER)
+    first = storage.write("S", GRID, None, "full")
+    second = storage.write("S", GRID[:2], None, "full")
+
+    assert storage.read(["S"])["S"] == GRID[:2]
+    assert first and second and first != second
+    assert storage.read_revisions()["S"] == second
+
+
+def test_delta_write_rewrites_only_changed_rows(storage):
+    storage.create_sheet("S", HEADER)
+    storage.write("S", GRID, None, "full")
+    before = stored_rows(storage, "S")
+
+    new = [HEADER, ["1", "x"], ["2", "CHANGED"], ["3", "z"], ["4", "w"]]
+    storage.write("S", new, GRID, "delta")
+    after = stored_rows(storage, "S")
+
+    assert storage.read(["S"])["S"] == new
+    assert {i for i in after if after[i] != before.get(i)} == {2, 4}
+
+
+def test_delta_write_truncates_and_skips_unchanged_grids(storage):
+    storage.create_sheet("S", HEADER)
+    revision = storage.write("S", GRID, None, "full")
+
+    assert storage.write("S", GRID, GRID, "delta") is None
+    assert storage.read_revisions()["S"] == revision
+
+    storage.write("S", GRID[:2], GRID, "delta")
+    assert storage.read(["S"])["S"] == GRID[:2]
+    assert sorted(stored_rows(storage, "S")) == [0, 1]
+
+
+def test_markers_come_back_with_the_revisions(storage):
+    storage.write_marker("eom_rollover", "2024-03")
+    assert storage.read_revisions()["eom_rollover"] == "2024-03"
+    assert "eom_rollover" not in storage.sheet_titles()
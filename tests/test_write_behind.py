@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+SHEET = "Projects"
+
+
+class GatedBackend:
+    """Backend finto: registra le griglie scritte; ogni scrittura può aspettare un evento
+    (per fermare il worker a metà) o fallire"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.writes = []
+        self.gates = {}
+        self.started = threading.Event()
+
+    def gate(self, n):
+        self.gates[n] = threading.Event()
+        return self.gates[n]
+
+    def write(self, sheet_name, values, previous, mode):
+        n = len(self.writes)
+        self.writes.append(values)
+        self.started.set()
+        if n in self.gates:
+            self.gates[n].wait(5)
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return f"rev-{n}"
+
+    def read_revisions(self):
+        return {}
+
+
+@pytest.fixture
+def queue_app(app):
+    app.WRITE_BEHIND = True
+    app.WRITE_BEHIND_DELAY = 0
+    app.WRITE_BEHIND_MAX_DELAY = 0
+    return app
+
+
+def grid(app, *tasks):
+    header = app.dataframe_to_values(app.empty_frame(app.PROJECT_SCHEMA), SHEET)[0]
+    rows = [[""] * len(header) for _ in tasks]
+    for row, task in zip(rows, tasks):
+        row[header.index("Task")] = task
+        row[header.index("Task ID")] = task
+    return [header] + rows
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timeout"
+        time.sleep(0.01)
+
+
+def status(app):
+    with app.WRITE_QUEUE["cond"]:
+        return dict(app.WRITE_QUEUE["status"].get(SHEET, {}))
+
+
+def cached_tasks(app):
+    return app.SHEET_CACHE[SHEET]["df"]["Task"].tolist()
+
+
+def test_enqueue_updates_cache_before_flush(queue_app):
+    backend = queue_app.STORAGE = GatedBackend()
+    gate = backend.gate(0)
+    queue_app.enqueue_write(SHEET, grid(queue_app, "a"))
+    assert cached_tasks(queue_app) == ["a"]
+    gate.set()
+    wait_for(lambda: status(queue_app).get("state") == "flushed")
+    assert queue_app.SHEET_CACHE[SHEET]["revision"] == "rev-0"
+    assert queue_app.SHEET_SNAPSHOTS[SHEET]["values"] == grid(queue_app, "a")
+
+
+def test_older_flush_does_not_overwrite_newer_pending_grid(queue_app):
+    backend = queue_app.STORAGE = GatedBackend()
+    first, second = backend.gate(0), backend.gate(1)
+    queue_app.enqueue_write(SHEET, grid(queue_app, "old"))
+    assert backend.started.wait(5)
+    queue_app.enqueue_write(SHEET, grid(queue_app, "new"))
+
+    first.set()
+    wait_for(lambda: len(backend.writes) == 2)
+    # la prima griglia è salvata, ma la cache resta quella più recente ancora in scrittura
+    assert cached_tasks(queue_app) == ["new"]
+    assert queue_app.SHEET_SNAPSHOTS[SHEET]["values"] == grid(queue_app, "old")
+
+    second.set()
+    wait_for(lambda: status(queue_app).get("state") == "flushed" and queue_app.get_pending_values(SHEET) is None)
+    wait_for(lambda: queue_app.SHEET_CACHE[SHEET]["revision"] == "rev-1")
+    assert cached_tasks(queue_app) == ["new"]
+
+
+def test_final_failure_drops_cache_and_reports_error(queue_app):
+    backend = queue_app.STORAGE = GatedBackend(fail=True)
+    queue_app.enqueue_write(SHEET, grid(queue_app, "lost"))
+    wait_for(lambda: status(queue_app).get("state") == "error")
+
+    assert len(backend.writes) == queue_app.WRITE_BEHIND_MAX_ATTEMPTS
+    assert SHEET not in queue_app.SHEET_CACHE
+    assert SHEET not in queue_app.SHEET_SNAPSHOTS
+
+    queue_app.render_write_status([SHEET])
+    kind, text = queue_app.st.messages[-1]
+    assert kind == "error"
+    assert "quota exceeded" in text
+